@@ -1,36 +1,82 @@
+import re
 import json
 import urllib.error
 import urllib.request
 import os
+import concurrent.futures
 
-def load_env_variable(file_path, key):
+def load_env_file(file_path):
     """
-    Loads a specific environment variable from a .env file.
+    Loads every variable of a .env file into a dict.
     """
+    variables = {}
     try:
         with open(file_path, 'r') as f:
             for line in f:
                 line = line.strip()
                 if line and not line.startswith('#'):
                     k, v = line.split('=', 1)
-                    if k == key:
-                        return v
+                    variables[k] = v
     except FileNotFoundError:
         print(f"Error: .env file not found at {file_path}")
     except Exception as e:
         print(f"Error loading .env file: {e}")
-    return None
+    return variables
+
+def load_env_variable(file_path, key):
+    """
+    Loads a specific environment variable from a .env file.
+    """
+    return load_env_file(file_path).get(key)
 
-API_KEY = load_env_variable(f"{os.path.dirname(__file__)}/.env", "GEMINI_API_TOKEN")
+_ENV = load_env_file(f"{os.path.dirname(__file__)}/.env")
+API_KEY = _ENV.get("GEMINI_API_TOKEN")
 MODEL_NAME = "gemini-2.5-flash-preview-05-20"
 #MODEL_NAME = "gemma-3-27b-it"
 
-def call_gemini_api(contents):
+# Number of languages asked for in each request; the requests for the groups run concurrently
+LANGUAGE_GROUP_SIZE = int(_ENV.get("LANGUAGE_GROUP_SIZE", 5))
+# How many more times the languages missing from a reply are asked for
+MAX_MISSING_RETRIES = int(_ENV.get("MAX_MISSING_RETRIES", 2))
+# Translations already obtained, per English text and language code
+CACHE_FILE = _ENV.get("TRANSLATION_CACHE_FILE") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "translation_cache.json")
+
+# Define the target languages
+TARGET_LANGUAGES = {
+    "Czech":        "cs",
+    "Danish":       "da",
+    "German":       "de",
+    "Greek":        "el",
+    "English":      "en",
+    "Spanish":      "es",
+    "Estonian":     "et",
+    "Finnish":      "fi",
+    "French":       "fr",
+    "Hebrew":       "he",
+    "Croatian":     "hr",
+    "Hungarian":    "hu",
+    "Icelandic":    "is",
+    "Italian":      "it",
+    "Korean":       "ko",
+    "Latvian":      "lv",
+    "Dutch":        "nl",
+    "Norwegian":    "no",
+    "Polish":       "pl",
+    "Portuguese":   "pt",
+    "Russian":      "ru",
+    "Slovak":       "sk",
+    "Slovenian":    "sl",
+    "Swedish":      "sv",
+    "Turkish":      "tr",
+}
+
+def call_gemini_api(contents, max_output_tokens=4096):
     """
     Makes a call to the Gemini API with the given contents.
 
     Args:
         contents (list): A list of content parts for the API request.
+        max_output_tokens (int): Upper bound on the length of the reply.
 
     Returns:
         dict: The JSON response from the API, or None if an error occurs.
@@ -46,7 +92,7 @@ def call_gemini_api(contents):
             "temperature": 0.2, # Lower temperature for more deterministic translations
             "topK": 1,
             "topP": 1,
-            "maxOutputTokens": 4096,
+            "maxOutputTokens": max_output_tokens,
         }
     }
 
@@ -99,6 +145,114 @@ def list_models():
 #                print("-" * 30)
 #            print("\n" + "-" * 50)
 
+def load_cache(path=CACHE_FILE):
+    """
+    Loads the translation cache: {english_text: {language_code: translation}}.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Warning: could not read the translation cache {path}: {e}")
+        return {}
+
+def save_cache(cache, path=CACHE_FILE):
+    """
+    Saves the translation cache, through a temporary file so it's never left half-written.
+    """
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Warning: could not write the translation cache {path}: {e}")
+
+def build_prompt(text, languages):
+    """
+    Builds the translation prompt for the given {language_name: language_code} languages.
+    """
+    translation_requests = [f"- {lang_name} (Code: {lang_code})" for lang_name, lang_code in languages.items()]
+
+    return (
+        f"Translate the following English text to the specified languages, using their ISO 639-1 codes for the translation. "
+        f"The text will be displayed on a Point of Sale (POS) terminal screen, "
+        f"so the translation must be concise and use common terminology for payments and card handling. "
+        f"For each language, output only the translated text on a single line, prefixed with the language code and a colon, like 'de: Translated Text'. "
+        f"Do not include any other introductory or concluding remarks.\n\n"
+        f"Original English Text: {text}\n\n"
+        f"Target Languages:\n" + "\n".join(translation_requests)
+    )
+
+# "de: Text", also accepting list markers, bold and the language name the model sometimes adds
+_TRANSLATION_LINE_RE = re.compile(r"^[\s*\-\u2022]*(?:[A-Za-z ]+\()?([a-z]{2})\)?\**\s*:\s*\**\s*(.+?)\s*$")
+
+def parse_translations(reply, codes):
+    """
+    Extracts {language_code: translation} from a reply, keeping only the requested codes.
+    """
+    translations = {}
+    for line in reply.splitlines():
+        match = _TRANSLATION_LINE_RE.match(line)
+        if match and match.group(1) in codes and match.group(1) not in translations:
+            translations[match.group(1)] = match.group(2)
+    return translations
+
+def translate_group(text, languages):
+    """
+    Asks for the translation of text into one group of {language_name: language_code} languages.
+
+    Returns:
+        dict: {language_code: translation} for the languages found in the reply.
+    """
+    contents = [{"parts": [{"text": build_prompt(text, languages)}]}]
+    # About 100 tokens per language is plenty for a POS message
+    response = call_gemini_api(contents, max_output_tokens=max(1024, 128 * len(languages)))
+    if not response or not response.get("candidates"):
+        return {}
+    try:
+        reply = response["candidates"][0]["content"]["parts"][0]["text"]
+    except (KeyError, IndexError):
+        return {}
+    return parse_translations(reply, set(languages.values()))
+
+def translate_text(text, languages, group_size=LANGUAGE_GROUP_SIZE, cache=None):
+    """
+    Translates text into every {language_name: language_code} language.
+
+    The languages are split into groups of group_size, requested concurrently.
+    Languages missing from the replies are requested again on their own group, up to
+    MAX_MISSING_RETRIES times. Translations found in cache (a dict as returned by
+    load_cache) are not requested, and new ones are added to it.
+
+    Returns:
+        dict: {language_code: translation} for every language that could be translated.
+    """
+    cached = cache.get(text, {}) if cache is not None else {}
+    results = {code: cached[code] for code in languages.values() if code in cached}
+    if results:
+        print(f"{len(results)} of {len(languages)} translations found in the cache.")
+
+    for attempt in range(1 + MAX_MISSING_RETRIES):
+        missing = {name: code for name, code in languages.items() if code not in results}
+        if not missing:
+            break
+        if attempt > 0:
+            print(f"Requesting the {len(missing)} missing languages again: {', '.join(missing.values())}")
+
+        names = list(missing)
+        groups = [{name: missing[name] for name in names[i:i + group_size]} for i in range(0, len(names), max(1, group_size))]
+        print(f"Calling API ({len(groups)} requests)")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(groups)) as executor:
+            for translations in executor.map(lambda group: translate_group(text, group), groups):
+                results.update(translations)
+
+    if cache is not None and results:
+        cache[text] = {**cached, **results}
+    return results
+
 def main():
     """
     Main function to get user input and perform translations.
@@ -116,62 +270,19 @@ def main():
         list_models()
         return
 
-    # Define the target languages
-    target_languages = {
-        "Czech":        "cs",
-        "Danish":       "da",
-        "German":       "de",
-        "Greek":        "el",
-        "English":      "en",
-        "Spanish":      "es",
-        "Estonian":     "et",
-        "Finnish":      "fi",
-        "French":       "fr",
-        "Hebrew":       "he",
-        "Croatian":     "hr",
-        "Hungarian":    "hu",
-        "Icelandic":    "is",
-        "Italian":      "it",
-        "Korean":       "ko",
-        "Latvian":      "lv",
-        "Dutch":        "nl",
-        "Norwegian":    "no",
-        "Polish":       "pl",
-        "Portuguese":   "pt",
-        "Russian":      "ru",
-        "Slovak":       "sk",
-        "Slovenian":    "sl",
-        "Swedish":      "sv",
-        "Turkish":      "tr",
-    }
-
-    # Construct a single prompt for all translations
-    translation_requests = [f"- {lang_name} (Code: {lang_code})" for lang_name, lang_code in target_languages.items()]
-
-    prompt = (
-        f"Translate the following English text to the specified languages, using their ISO 639-1 codes for the translation. "
-        f"The text will be displayed on a Point of Sale (POS) terminal screen, "
-        f"so the translation must be concise and use common terminology for payments and card handling. "
-        f"For each language, output only the translated text, prefixed with the language name and a colon, like 'Language: Translated Text'. "
-        f"Do not include any other introductory or concluding remarks.\n\n"
-        f"Original English Text: {user_input}\n\n"
-        f"Target Languages:\n" + "\n".join(translation_requests)
-    )
-
-    contents = [{"parts": [{"text": prompt}]}]
-
-    print("\nCalling API")
-    response = call_gemini_api(contents)
+    cache = load_cache()
+    translations = translate_text(user_input, TARGET_LANGUAGES, cache=cache)
+    save_cache(cache)
 
     print("\n--- Translations ---")
-    if response and response.get("candidates"):
-        translated_content = response["candidates"][0]["content"]["parts"][0]["text"].strip()
-        # Assuming the model returns translations in the requested format,
-        # we can split by lines and print them.
-        for line in translated_content.split('\n'):
-            print(line)
-    else:
-        print("Error: Could not retrieve translations from API response.")
+    missing = []
+    for lang_name, lang_code in TARGET_LANGUAGES.items():
+        if lang_code in translations:
+            print(f"{lang_name}: {translations[lang_code]}")
+        else:
+            missing.append(lang_name)
+    if missing:
+        print(f"\nError: no translation could be retrieved for {', '.join(missing)}.")
 
     print("\n" + "-" * 50)
     print("Process finished.")
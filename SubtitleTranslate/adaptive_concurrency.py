@@ -0,0 +1,83 @@
+import time
+import threading
+import logging
+
+
+class AdaptiveConcurrency:
+    """Limit on the number of requests in flight, tuned with AIMD (additive increase, multiplicative decrease).
+
+    Every successful request answered within *latency_tolerance* times the
+    fastest recent latency raises the limit by ``increase / limit``, i.e. by
+    *increase* per round of requests. A throttled (HTTP 429/503) or failed
+    request multiplies it by *decrease*; requests started before the last
+    decrease don't decrease it again, so one burst of failures only counts
+    once. The limit stays between *minimum* and *maximum*.
+
+    Meant to be shared by worker threads: call :meth:`acquire` before a
+    request and :meth:`release` with its outcome after it.
+    """
+
+    def __init__(self, initial: int = 8, minimum: int = 1, maximum: int = 64, increase: float = 1.0,
+                 decrease: float = 0.5, latency_tolerance: float = 2.0):
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.peak_limit = self.limit
+        self.baseline_latency = None
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.decreases = 0
+
+    def acquire(self) -> float:
+        """Wait until one more request fits under the limit; returns a token to pass to :meth:`release`."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, token: float, outcome: str = "ok"):
+        """Record the *outcome* ("ok", "throttled" or "error") of the request started at *token*."""
+        now = time.monotonic()
+        latency = now - token
+        with self._condition:
+            self.in_flight -= 1
+            self.requests += 1
+            if outcome == "ok":
+                if self.baseline_latency is None or latency < self.baseline_latency:
+                    self.baseline_latency = latency
+                else:
+                    # Let the baseline drift up slowly, in case the server got slower for good
+                    self.baseline_latency += (latency - self.baseline_latency) * 0.01
+                if latency <= self.baseline_latency * self.latency_tolerance:
+                    self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+                    self.peak_limit = max(self.peak_limit, self.limit)
+            else:
+                if outcome == "throttled":
+                    self.throttled += 1
+                else:
+                    self.errors += 1
+                if token >= self._last_decrease:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._last_decrease = now
+                    self.decreases += 1
+                    logging.info(f"Request {outcome}; lowering concurrency to {int(self.limit)}.")
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "limit": int(self.limit),
+                "peak_limit": int(self.peak_limit),
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "errors": self.errors,
+                "decreases": self.decreases,
+            }
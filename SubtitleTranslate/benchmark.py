@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+
+import translate_subs_llm
+from mock_llm_server import MockLLMServer, MockSettings
+from srt_parser import format_timestamp
+
+_WORDS = (
+    "we need to get out of here before they come back I told you this was a bad idea "
+    "where did you put the keys it's not my fault you never listen to me what are you doing "
+    "look at this place nobody has lived here for years come on just trust me one more time"
+).split()
+
+
+def _synthetic_line(rng: random.Random) -> str:
+    words = rng.sample(_WORDS, rng.randint(3, 8))
+    words[0] = words[0].capitalize()
+    return " ".join(words) + rng.choice((".", "?", "!", ",", "..."))
+
+
+def write_synthetic_srt(path: str, block_count: int, seed: int = 1) -> str:
+    """Write a reproducible SRT file of *block_count* blocks: one or two lines of dialogue, some sound effects."""
+    rng = random.Random(seed * 1_000_003 + block_count)
+    start_ms = 1000
+    with open(path, "w", encoding="utf-8") as f:
+        for number in range(1, block_count + 1):
+            duration = rng.randint(1200, 4000)
+            roll = rng.random()
+            if roll < 0.1:
+                text = rng.choice(("[music playing]", "[door slams]", "[phone ringing]"))
+            elif roll < 0.25:
+                text = f"- {_synthetic_line(rng)}\n- {_synthetic_line(rng)}"
+            elif roll < 0.6:
+                text = f"{_synthetic_line(rng)}\n{_synthetic_line(rng)}"
+            else:
+                text = _synthetic_line(rng)
+            f.write(f"{number}\n{format_timestamp(start_ms)} --> {format_timestamp(start_ms + duration)}\n{text}\n\n")
+            start_ms += duration + rng.randint(100, 1500)
+    return path
+
+
+def _benchmark_config(base_url: str, args) -> dict:
+    return {
+        "llm_provider": "local",
+        "local": {"base_url": base_url, "api_key": "benchmark", "model_name": "mock"},
+        "translation": {
+            "target_language": "pt-PT",
+            "output_suffix": ".pt",
+            "context_blocks_previous": 2,
+            "context_blocks_next": 2,
+            "max_workers": args.workers,
+            "batch_size": args.batch_size,
+            "speculative_prefetch": args.speculative_prefetch,
+            "line_repair": not args.no_line_repair,
+            "prompt_layout": args.prompt_layout
+        },
+        "translation_memory": {"enabled": False},
+        "telemetry": {"enabled": True, "summary_json": True}
+    }
+
+
+def run_benchmark(args) -> list:
+    """Translate a synthetic file of each size against the mock server and return one result per size."""
+    workdir = tempfile.mkdtemp(prefix="subtitle_benchmark_")
+    settings = MockSettings(args.latency, args.jitter, args.error_rate, args.rate_limit_rate, args.mismatch_rate, args.seed)
+    results = []
+    try:
+        with MockLLMServer(settings) as server:
+            translate_subs_llm.configure(_benchmark_config(server.base_url, args))
+
+            for size in args.sizes:
+                srt_path = write_synthetic_srt(os.path.join(workdir, f"bench_{size}.eng.srt"), size, args.seed)
+                requests_before = settings.requests
+                started = time.monotonic()
+                ok = translate_subs_llm.translate_file(srt_path, "pt-PT", ".pt")
+                elapsed = time.monotonic() - started
+                requests = settings.requests - requests_before
+
+                with open(os.path.join(workdir, f"metrics_{os.path.basename(srt_path)}.json"), encoding="utf-8") as f:
+                    metrics = json.load(f)
+
+                # Request count without any retry (repeated cues are only sent once)
+                ideal_requests = max(1, math.ceil(metrics["blocks"]["translated"] / args.batch_size))
+                latency = metrics["requests"]["latency_seconds"]
+                results.append({
+                    "blocks": size,
+                    "ok": ok,
+                    "elapsed_seconds": round(elapsed, 3),
+                    "blocks_per_second": round(size / elapsed, 2) if elapsed > 0 else None,
+                    "requests": requests,
+                    "latency_p50": latency["p50"],
+                    "latency_p99": latency["p99"],
+                    "retry_overhead": round((requests - ideal_requests) / ideal_requests, 4),
+                    "retries": metrics["retries"],
+                    "lines_repaired": metrics["lines_repaired"],
+                })
+    finally:
+        if args.keep:
+            print(f"Benchmark files kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def print_results(results: list):
+    header = f"{'blocks':>7} {'seconds':>8} {'blocks/s':>9} {'requests':>9} {'p50 (s)':>8} {'p99 (s)':>8} {'retry ovh':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['blocks']:>7} {r['elapsed_seconds']:>8.2f} {r['blocks_per_second']:>9.2f} {r['requests']:>9} "
+              f"{r['latency_p50'] or 0:>8.3f} {r['latency_p99'] or 0:>8.3f} {r['retry_overhead']:>9.1%}")
+
+
+def compare_to_baseline(results: list, baseline_path: str, tolerance: float) -> bool:
+    """Return False (and report it) if the throughput of any size fell more than *tolerance* below the baseline."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {r["blocks"]: r for r in json.load(f)["results"]}
+
+    passed = True
+    for r in results:
+        base = baseline.get(r["blocks"])
+        if not base or not base.get("blocks_per_second"):
+            continue
+        change = r["blocks_per_second"] / base["blocks_per_second"] - 1
+        status = "OK"
+        if change < -tolerance:
+            status = "REGRESSION"
+            passed = False
+        print(f"{r['blocks']:>7} blocks: {base['blocks_per_second']:.2f} -> {r['blocks_per_second']:.2f} blocks/s ({change:+.1%}) {status}")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark translate_subs_llm.py offline, against a mock OpenAI-compatible server."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 2000], help="Number of blocks of each synthetic file.")
+    parser.add_argument("--workers", type=int, default=8, help="translation.max_workers")
+    parser.add_argument("--batch-size", type=int, default=1, help="translation.batch_size")
+    parser.add_argument("--speculative-prefetch", action="store_true", help="Enable translation.speculative_prefetch.")
+    parser.add_argument("--prompt-layout", choices=("classic", "cached_prefix"), default="classic",
+                        help="translation.prompt_layout")
+    parser.add_argument("--no-line-repair", action="store_true", help="Disable translation.line_repair.")
+    parser.add_argument("--latency", type=float, default=0.1, help="Mean mock response time in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Uniform spread of the mock response time in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of an HTTP 500 response.")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probability of an HTTP 429 response.")
+    parser.add_argument("--mismatch-rate", type=float, default=0.0, help="Probability of a reply with the wrong line count.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the synthetic files and of the mock failures.")
+    parser.add_argument("--json", dest="json_path", help="Write the results to this JSON file (usable as a baseline).")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare the throughput against.")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed throughput drop vs the baseline (default 0.1 = 10%%).")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated files, outputs and logs.")
+    parser.add_argument("--verbose", action="store_true", help="Show the translator's log.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    results = run_benchmark(args)
+    print_results(results)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"settings": {k: v for k, v in vars(args).items() if k not in ("json_path", "baseline")},
+                       "results": results}, f, indent=2)
+            f.write("\n")
+
+    if not all(r["ok"] for r in results):
+        print("Some files failed to translate.")
+        sys.exit(1)
+    if args.baseline and not compare_to_baseline(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
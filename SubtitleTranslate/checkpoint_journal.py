@@ -0,0 +1,107 @@
+import os
+import json
+import hashlib
+import logging
+
+
+def text_hash(text: str) -> str:
+    """Short, stable hash of *text* used to check that a journal entry still matches its source block."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def file_hash(path: str) -> str:
+    """Hash of the contents of the file at *path*, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+class CheckpointJournal:
+    """Append-only, fsync'd sidecar journal of translated blocks.
+
+    The first line is a header with the hash of the whole source file; every
+    following line records one translated block as ``{"i": index, "h":
+    source_hash, "t": translation}``. Blocks can be recorded in any order, and
+    a line cut short by a crash is simply ignored when the journal is loaded.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self):
+        """Read the journal.
+
+        Returns ``(source_hash, entries)`` where *entries* maps block index to
+        ``(block_hash, translation)``, or ``(None, {})`` if there is no usable journal.
+        """
+        entries = {}
+        source_hash = None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line_num, line in enumerate(f):
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Partial write of the last record before a crash
+                        logging.warning(f"Ignoring truncated line {line_num + 1} in checkpoint journal {self.path}.")
+                        continue
+
+                    if line_num == 0:
+                        if record.get("version") != self.VERSION:
+                            logging.warning(f"Unsupported checkpoint journal version in {self.path}. Ignoring it.")
+                            return None, {}
+                        source_hash = record.get("source_hash")
+                    elif "i" in record and "t" in record:
+                        entries[record["i"]] = (record.get("h"), record["t"])
+        except FileNotFoundError:
+            return None, {}
+        except OSError as e:
+            logging.warning(f"Failed to read checkpoint journal {self.path}: {e}")
+            return None, {}
+
+        return source_hash, entries
+
+    def start(self, source_hash: str, entries: dict):
+        """(Re)write the journal with a fresh header and the given *entries*, then open it for appending.
+
+        The compacted journal is written to a temporary file and swapped in atomically.
+        """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"version": self.VERSION, "source_hash": source_hash}) + "\n")
+            for index in sorted(entries):
+                block_hash, translation = entries[index]
+                f.write(json.dumps({"i": index, "h": block_hash, "t": translation}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def record(self, items):
+        """Append ``(index, source_text, translation)`` *items* and fsync them to disk."""
+        for index, source_text, translation in items:
+            self._file.write(json.dumps({"i": index, "h": text_hash(source_text), "t": translation}, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """Close and delete the journal once the translation is complete."""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,134 @@
+import time
+import asyncio
+import logging
+
+
+class Endpoint:
+    """One OpenAI-compatible server of an :class:`EndpointPool`.
+
+    *client* is the API client used to reach it, *provider* and *model_name*
+    describe how requests must be built for it. At most *max_concurrent*
+    requests are sent to it at once (None for no limit), and *weight* sets
+    its share of the traffic.
+    """
+
+    def __init__(self, name: str, client, provider: str, model_name: str, weight: float = 1.0,
+                 max_concurrent=None, rate_limiter=None):
+        self.name = name
+        self.client = client
+        self.provider = provider
+        self.model_name = model_name
+        self.weight = max(0.01, float(weight))
+        self.max_concurrent = max_concurrent
+        self.rate_limiter = rate_limiter
+        self.outstanding = 0
+        self.healthy = True
+        self.retry_at = 0.0  # When a down endpoint is probed again
+        self.probing = False
+        self.current_weight = 0.0  # Smooth weighted round-robin state
+
+    def has_capacity(self) -> bool:
+        return self.max_concurrent is None or self.outstanding < self.max_concurrent
+
+
+class EndpointPool:
+    """Routes requests across several endpoints, with health checking and an optional fallback.
+
+    *routing* is ``"least_outstanding"`` (the endpoint with the fewest requests
+    in flight relative to its weight) or ``"weighted_round_robin"`` (smooth
+    weighted round-robin, as in nginx). An endpoint that fails with a
+    connection or server error is taken out of rotation and probed with
+    *probe* every *health_check_interval* seconds until it answers again.
+
+    The *fallback* endpoint is only used when every endpoint is saturated or
+    down; otherwise callers wait for a slot. Health tracking is disabled with
+    a single endpoint and no fallback, since there is nowhere else to go.
+    """
+
+    def __init__(self, endpoints: list, routing: str = "least_outstanding", fallback=None,
+                 health_check_interval: float = 30.0, probe=None):
+        self.endpoints = endpoints
+        self.routing = routing
+        self.fallback = fallback
+        self.health_check_interval = health_check_interval
+        self._probe = probe
+        self._track_health = len(endpoints) > 1 or fallback is not None
+        self._changed = asyncio.Event()
+        self._probe_tasks = set()
+        self._using_fallback = False
+
+    def _candidates(self):
+        return [e for e in self.endpoints if e.healthy and e.has_capacity()]
+
+    def _pick(self):
+        candidates = self._candidates()
+        if not candidates:
+            return None
+        if self.routing == "weighted_round_robin":
+            total = sum(e.weight for e in candidates)
+            for e in candidates:
+                e.current_weight += e.weight
+            chosen = max(candidates, key=lambda e: e.current_weight)
+            chosen.current_weight -= total
+            return chosen
+        return min(candidates, key=lambda e: e.outstanding / e.weight)
+
+    def _start_due_probes(self):
+        now = time.monotonic()
+        for endpoint in self.endpoints:
+            if not endpoint.healthy and not endpoint.probing and endpoint.retry_at <= now:
+                endpoint.probing = True
+                task = asyncio.ensure_future(self._run_probe(endpoint))
+                self._probe_tasks.add(task)
+                task.add_done_callback(self._probe_tasks.discard)
+
+    async def _run_probe(self, endpoint: Endpoint):
+        try:
+            if self._probe is not None:
+                await self._probe(endpoint)
+            endpoint.healthy = True
+            logging.info(f"LLM endpoint {endpoint.name} is back up.")
+        except Exception as e:
+            endpoint.retry_at = time.monotonic() + self.health_check_interval
+            logging.debug(f"Health check of LLM endpoint {endpoint.name} failed: {e}")
+        finally:
+            endpoint.probing = False
+            self._changed.set()
+
+    def _next_probe_delay(self):
+        down = [e.retry_at for e in self.endpoints if not e.healthy and not e.probing]
+        return max(0.0, min(down) - time.monotonic()) if down else None
+
+    async def acquire(self) -> Endpoint:
+        """Wait for an endpoint able to take one more request, and reserve a slot on it."""
+        while True:
+            self._start_due_probes()
+            endpoint = self._pick()
+            if endpoint is None and self.fallback is not None and self.fallback.has_capacity():
+                endpoint = self.fallback
+                if not self._using_fallback:
+                    logging.warning(f"Every LLM endpoint is saturated or down, failing over to {endpoint.name}.")
+                    self._using_fallback = True
+            elif endpoint is not None:
+                self._using_fallback = False
+
+            if endpoint is not None:
+                endpoint.outstanding += 1
+                return endpoint
+
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), self._next_probe_delay())
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self, endpoint: Endpoint, failed: bool = False):
+        """Free the slot taken on *endpoint*; *failed* takes it out of rotation after a connection or server error."""
+        endpoint.outstanding -= 1
+        if failed and self._track_health and endpoint is not self.fallback and endpoint.healthy:
+            endpoint.healthy = False
+            endpoint.retry_at = time.monotonic() + self.health_check_interval
+            logging.warning(
+                f"LLM endpoint {endpoint.name} failed; taking it out of rotation for {self.health_check_interval:.0f}s."
+            )
+        self._changed.set()
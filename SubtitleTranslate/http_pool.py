@@ -0,0 +1,137 @@
+import base64
+import threading
+import http.client
+import urllib.parse
+import urllib.request
+
+# Errors meaning an idle keep-alive connection was closed by the server in the meantime
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                            BrokenPipeError, ConnectionResetError, ConnectionAbortedError)
+
+
+class HTTPConnectionPool:
+    """Thread-safe pool of keep-alive HTTP(S) connections to a single host.
+
+    At most *max_connections* requests are in flight at once; idle connections
+    are reused most recently used first, so the TLS handshake is only paid
+    once per connection instead of once per request. Like urllib, the
+    ``HTTP(S)_PROXY`` and ``NO_PROXY`` environment variables are honoured:
+    HTTPS goes through a CONNECT tunnel, plain HTTP sends absolute URLs to the
+    proxy. Counters of opened and reused connections are kept for :meth:`stats`.
+    """
+
+    def __init__(self, base_url: str, max_connections: int = 10, timeout: float = 5.0):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.scheme = parsed.scheme or "https"
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.base_path = parsed.path.rstrip("/")
+        self.timeout = timeout
+        self.proxy = self._find_proxy()
+        self.max_connections = max(1, int(max_connections))
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._idle = []
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.stale_connections = 0
+
+    def _find_proxy(self):
+        """Return ``(host, port, headers)`` of the proxy to reach the host through, or None to connect directly."""
+        proxy_url = urllib.request.getproxies().get(self.scheme)
+        if not proxy_url or urllib.request.proxy_bypass(self.host):
+            return None
+        if "://" not in proxy_url:
+            proxy_url = "http://" + proxy_url
+        parsed = urllib.parse.urlsplit(proxy_url)
+        headers = {}
+        if parsed.username:
+            credentials = f"{urllib.parse.unquote(parsed.username)}:{urllib.parse.unquote(parsed.password or '')}"
+            headers["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+        return parsed.hostname, parsed.port or (443 if parsed.scheme == "https" else 80), headers
+
+    def _new_connection(self):
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        with self._lock:
+            self.connections_opened += 1
+        if self.proxy is None:
+            return connection_class(self.host, self.port, timeout=self.timeout)
+
+        proxy_host, proxy_port, proxy_headers = self.proxy
+        connection = connection_class(proxy_host, proxy_port, timeout=self.timeout)
+        if self.scheme == "https":
+            connection.set_tunnel(self.host, self.port, headers=proxy_headers)
+        return connection
+
+    def _checkout(self):
+        """Return ``(connection, reused)``, an idle connection if there is one."""
+        with self._lock:
+            if self._idle:
+                self.connections_reused += 1
+                return self._idle.pop(), True
+        return self._new_connection(), False
+
+    def _send(self, connection, method: str, path: str, body, headers: dict):
+        url = self.base_path + path
+        if self.proxy is not None and self.scheme != "https":
+            # A plain HTTP proxy is sent the absolute URL (and its credentials) with every request
+            netloc = self.host if self.port is None else f"{self.host}:{self.port}"
+            url = f"{self.scheme}://{netloc}{url}"
+            headers = {**self.proxy[2], **headers}
+        connection.request(method, url, body=body, headers=headers)
+        response = connection.getresponse()
+        # The body has to be read in full before the connection can carry another request
+        return response, response.read()
+
+    def request(self, method: str, path: str, body=None, headers=None):
+        """Send a request and return ``(status, headers, body)``; *path* is relative to the base URL."""
+        headers = headers or {}
+        with self._slots:
+            with self._lock:
+                self.requests += 1
+            connection, reused = self._checkout()
+            try:
+                try:
+                    response, data = self._send(connection, method, path, body, headers)
+                except _STALE_CONNECTION_ERRORS:
+                    if not reused:
+                        raise
+                    # The server closed the idle connection; retry once on a fresh one
+                    connection.close()
+                    with self._lock:
+                        self.stale_connections += 1
+                        self.connections_reused -= 1
+                    connection = self._new_connection()
+                    response, data = self._send(connection, method, path, body, headers)
+            except Exception:
+                connection.close()
+                raise
+
+            if response.will_close:
+                connection.close()
+            else:
+                with self._lock:
+                    self._idle.append(connection)
+            return response.status, response.headers, data
+
+    def get(self, path: str, headers=None):
+        return self.request("GET", path, headers=headers)
+
+    def stats(self) -> dict:
+        """Connection reuse counters: requests sent, connections opened and how many requests reused one."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "connections_reused": self.connections_reused,
+                "stale_connections": self.stale_connections,
+                "reuse_ratio": round(self.connections_reused / self.requests, 4) if self.requests else None,
+            }
+
+    def close(self):
+        """Close the idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
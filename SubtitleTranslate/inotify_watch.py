@@ -0,0 +1,108 @@
+import os
+import re
+import sys
+import errno
+import struct
+import ctypes
+import ctypes.util
+
+# Flags from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+_EVENT_HEADER = struct.Struct("iIII")
+
+# File systems whose changes made by other machines don't produce inotify events
+_NETWORK_FILESYSTEMS = ("nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "afs", "ceph", "glusterfs", "lustre",
+                        "fuse.sshfs", "fuse.rclone", "davfs", "fuse.davfs2")
+
+
+def is_supported() -> bool:
+    """Whether inotify can be used on this platform."""
+    return sys.platform.startswith("linux")
+
+
+def is_network_filesystem(path: str) -> bool:
+    """Whether *path* is on a network mount (NFS, SMB/CIFS...), according to ``/proc/self/mounts``."""
+    path = os.path.realpath(path)
+    best_mount, best_type = "", None
+    try:
+        with open("/proc/self/mounts", "r", encoding="utf-8") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                # Spaces and other special characters in mount points are escaped as octal (\040)
+                mount_point = re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), fields[1])
+                inside = path == mount_point or path.startswith(mount_point.rstrip("/") + "/")
+                if inside and len(mount_point) >= len(best_mount):
+                    best_mount, best_type = mount_point, fields[2]
+    except OSError:
+        return False
+    return best_type in _NETWORK_FILESYSTEMS
+
+
+class InotifyWatcher:
+    """Minimal inotify wrapper (through ctypes) reporting files written or moved into a single folder.
+
+    Only files that were closed after writing or moved into the folder are
+    reported, so files still being copied are not picked up halfway. Raises
+    OSError if inotify is not available.
+    """
+
+    def __init__(self, folder: str):
+        if not is_supported():
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            err = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(err, f"inotify_add_watch failed for {folder}: {os.strerror(err)}")
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def read_events(self):
+        """Read the pending events without blocking.
+
+        Returns ``(filenames, overflowed)``; *overflowed* is True when the kernel
+        queue overflowed and events were lost, so the folder must be rescanned.
+        """
+        filenames = set()
+        overflowed = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + name_len].rstrip(b"\0")
+                offset += name_len
+
+                if mask & IN_Q_OVERFLOW:
+                    overflowed = True
+                elif name:
+                    filenames.add(os.fsdecode(name))
+        return filenames, overflowed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
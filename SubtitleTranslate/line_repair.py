@@ -0,0 +1,180 @@
+import re
+import difflib
+
+# A translated line at least this similar to a context line is considered an echo of it
+ECHO_SIMILARITY = 0.85
+
+# Extra cost of merging two translated lines / splitting one, on top of the length mismatch
+_MERGE_PENALTY = 0.3
+_SPLIT_PENALTY = 0.3
+# Cost of leaving a source line without translation / dropping a translated line
+_SKIP_COST = 1.0
+# Two translated lines are only merged into one source line when together they are this many times
+# as long as it, and neither is shorter than this share of the merged line; otherwise the second one
+# is more likely a stray line (a preamble, an echo of the context) than a line the model broke in two
+_MERGE_LENGTH_RATIO = (0.6, 1.6)
+_MERGE_MIN_SHARE = 0.2
+
+_TERMINAL_PUNCT_RE = re.compile(r"[.!?…]['\"»)\]]*$")
+# End of a sentence inside a line, followed by another one
+_SENTENCE_BREAK_RE = re.compile(r"[.!?…]['\"»)\]]*\s+\S")
+# Places a line can be split at: after punctuation, or before a dialogue dash
+_SPLIT_POINT_RE = re.compile(r"(?<=[,;:.!?…])\s+|\s+(?=[-–—]\s)")
+_DIALOGUE_DASH_RE = re.compile(r"^\s*[-–—]")
+
+
+def similarity(a: str, b: str) -> float:
+    """Similarity ratio (0..1) of two lines, ignoring case and surrounding whitespace."""
+    return difflib.SequenceMatcher(None, a.strip().lower(), b.strip().lower()).ratio()
+
+
+def drop_echoed_context(lines: list, source_lines: list, context_lines: list, max_drops: int) -> list:
+    """Remove up to *max_drops* lines that echo a context line rather than translate a source line."""
+    if max_drops <= 0 or not context_lines:
+        return lines
+
+    kept = []
+    for line in lines:
+        if max_drops > 0:
+            echo = max(similarity(line, c) for c in context_lines)
+            own = max((similarity(line, s) for s in source_lines), default=0.0)
+            if echo >= ECHO_SIMILARITY and echo > own:
+                max_drops -= 1
+                continue
+        kept.append(line)
+    return kept
+
+
+def split_line(text: str, source_parts: list):
+    """Split the translated *text* in two at punctuation, in proportion to the two *source_parts*.
+
+    Returns the two parts, or None if there is no split point close enough to
+    where the source lines break.
+    """
+    first, second = source_parts
+    ratio = len(first) / max(1, len(first) + len(second))
+    dialogue = bool(_DIALOGUE_DASH_RE.match(second))
+
+    best = None
+    for match in _SPLIT_POINT_RE.finditer(text):
+        if dialogue and not _DIALOGUE_DASH_RE.match(text[match.end():]):
+            continue
+        distance = abs(match.start() / max(1, len(text)) - ratio)
+        if best is None or distance < best[0]:
+            best = (distance, match)
+
+    if best is None or best[0] > 0.3:
+        return None
+    head, tail = text[:best[1].start()].strip(), text[best[1].end():].strip()
+    return [head, tail] if head and tail else None
+
+
+def _length_cost(source_len: int, translated_len: int, ratio: float) -> float:
+    expected = source_len * ratio
+    return abs(translated_len - expected) / max(translated_len, expected, 1)
+
+
+def _punct_cost(source: str, translated: str) -> float:
+    return 0.1 if bool(_TERMINAL_PUNCT_RE.search(source)) != bool(_TERMINAL_PUNCT_RE.search(translated)) else 0.0
+
+
+def _merge_fits(source: str, first: str, second: str) -> bool:
+    # Two sentences are never glued into the translation of a line holding a single one
+    if _TERMINAL_PUNCT_RE.search(first) and not _SENTENCE_BREAK_RE.search(source):
+        return False
+    merged_len = len(first) + 1 + len(second)
+    low, high = _MERGE_LENGTH_RATIO
+    return (low * len(source) <= merged_len <= high * len(source)
+            and min(len(first), len(second)) >= _MERGE_MIN_SHARE * merged_len)
+
+
+def _align(source_lines: list, translated_lines: list) -> list:
+    """Align translated lines to source lines by length (Gale-Church style dynamic programming).
+
+    Returns the sequence of operations ``(kind, source_slice, translated_slice)``
+    where *kind* is one of "1-1", "1-2" (two translated lines for one source
+    line, only offered when their length fits it and they don't join two
+    sentences the source line doesn't have), "2-1" (one translated line
+    for two source lines), "1-0" and "0-1".
+    """
+    n, m = len(source_lines), len(translated_lines)
+    ratio = sum(len(l) for l in translated_lines) / max(1, sum(len(l) for l in source_lines))
+
+    inf = float("inf")
+    cost = [[inf] * (m + 1) for _ in range(n + 1)]
+    back = [[None] * (m + 1) for _ in range(n + 1)]
+    cost[0][0] = 0.0
+
+    for i in range(n + 1):
+        for j in range(m + 1):
+            base = cost[i][j]
+            if base == inf:
+                continue
+            steps = []
+            if i < n and j < m:
+                s, t = source_lines[i], translated_lines[j]
+                steps.append(("1-1", 1, 1, _length_cost(len(s), len(t), ratio) + _punct_cost(s, t)))
+            if i < n and j + 1 < m and _merge_fits(source_lines[i], translated_lines[j], translated_lines[j + 1]):
+                s, t = source_lines[i], translated_lines[j] + " " + translated_lines[j + 1]
+                steps.append(("1-2", 1, 2, _length_cost(len(s), len(t), ratio) + _punct_cost(s, t) + _MERGE_PENALTY))
+            if i + 1 < n and j < m:
+                s, t = source_lines[i] + " " + source_lines[i + 1], translated_lines[j]
+                steps.append(("2-1", 2, 1, _length_cost(len(s), len(t), ratio) + _punct_cost(s, t) + _SPLIT_PENALTY))
+            if i < n:
+                steps.append(("1-0", 1, 0, _SKIP_COST))
+            if j < m:
+                steps.append(("0-1", 0, 1, _SKIP_COST))
+
+            for kind, di, dj, step_cost in steps:
+                if base + step_cost < cost[i + di][j + dj]:
+                    cost[i + di][j + dj] = base + step_cost
+                    back[i + di][j + dj] = (kind, di, dj)
+
+    ops = []
+    i, j = n, m
+    while i or j:
+        kind, di, dj = back[i][j]
+        ops.append((kind, slice(i - di, i), slice(j - dj, j)))
+        i, j = i - di, j - dj
+    ops.reverse()
+    return ops
+
+
+def repair_line_count(source_lines: list, translated_lines: list, context_lines=()) -> list:
+    """Try to fit *translated_lines* to the line structure of *source_lines* without asking the model again.
+
+    Lines echoing *context_lines* are dropped first, then the remaining lines
+    are aligned to the source lines: two translated lines matching one source
+    line are merged (only when their length clearly fits it), and a translated
+    line covering two source lines is split at punctuation. *context_lines*
+    should hold the neighbouring blocks both in the source language and, when
+    known, translated. Returns a list with one entry per source line, None for
+    the source lines that could not be aligned or whose alignment is doubtful.
+    """
+    excess = len(translated_lines) - len(source_lines)
+    lines = drop_echoed_context(translated_lines, source_lines, list(context_lines), excess)
+    if len(lines) == len(source_lines):
+        return lines
+
+    ops = _align(source_lines, lines)
+    # Next to a dropped translated line the alignment is a guess (was the dropped line the stray one, or
+    # its neighbour?), so those source lines are left for the model to translate again
+    unsure = set()
+    for k, (kind, _, _) in enumerate(ops):
+        if kind == "0-1":
+            unsure.update(k + d for d in (-1, 1) if 0 <= k + d < len(ops))
+
+    repaired = [None] * len(source_lines)
+    for k, (kind, src, tr) in enumerate(ops):
+        if k in unsure:
+            continue
+        if kind == "1-1":
+            repaired[src.start] = lines[tr.start]
+        elif kind == "1-2":
+            repaired[src.start] = " ".join(lines[tr])
+        elif kind == "2-1":
+            parts = split_line(lines[tr.start], source_lines[src])
+            if parts is not None:
+                repaired[src.start], repaired[src.start + 1] = parts
+        # "1-0" leaves the source line unaligned and "0-1" drops a stray translated line
+    return repaired
@@ -0,0 +1,193 @@
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# The JSON payload is the last thing in the translation prompts
+_PAYLOAD_RE = re.compile(r"(\{.*\})\s*$", re.S)
+
+
+class MockSettings:
+    """Behaviour of the mock server: latency and how often each kind of failure is returned.
+
+    *latency* is the mean response time in seconds, spread uniformly by
+    +/- *jitter*. The rates are probabilities per request. Failures are drawn
+    from a seeded generator, so a run with the same settings and the same
+    requests is reproducible.
+    """
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.05, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, mismatch_rate: float = 0.0, seed: int = 1):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.mismatch_rate = mismatch_rate
+        self._random = random.Random(seed)
+        self._reply_random = random.Random(seed + 1)
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def draw(self):
+        """Return ``(delay, outcome)`` for the next request; outcome is "error", "rate_limit", "mismatch" or "ok"."""
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            roll = self._random.random()
+        for outcome, rate in (("error", self.error_rate), ("rate_limit", self.rate_limit_rate),
+                              ("mismatch", self.mismatch_rate)):
+            if roll < rate:
+                return delay, outcome
+            roll -= rate
+        return delay, "ok"
+
+    def reply(self, prompt: str, outcome: str) -> str:
+        with self._lock:
+            return build_reply(prompt, outcome, self._reply_random)
+
+
+def _translate_lines(lines: list) -> list:
+    return [f"[PT] {line}" for line in lines]
+
+
+def _break_line_count(lines: list, rng: random.Random) -> list:
+    """Return a reply with the wrong number of lines: a stray extra line, or two lines merged."""
+    if len(lines) > 1 and rng.random() < 0.5:
+        return [lines[0] + " " + lines[1]] + lines[2:]
+    return lines + ["[PT] ..."]
+
+
+def build_reply(prompt: str, outcome: str, rng: random.Random) -> str:
+    """Answer a single-block or batch translation prompt by prefixing every line with "[PT]"."""
+    match = _PAYLOAD_RE.search(prompt)
+    data = json.loads(match.group(1)) if match else {}
+
+    if "blocks" in data:
+        out = []
+        for i, block in enumerate(data["blocks"]):
+            translated = _translate_lines(block["lines"])
+            if outcome == "mismatch" and i == 0:
+                translated = _break_line_count(translated, rng)
+            out.append(f"[[{block['id']}]]")
+            out += translated
+        return "\n".join(out)
+
+    translated = _translate_lines(data.get("lines_to_translate", []))
+    if outcome == "mismatch":
+        translated = _break_line_count(translated, rng)
+    return "\n".join(translated)
+
+
+def make_handler(settings: MockSettings):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, body: dict, headers=None):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            # /v1/models, used as a health check
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            delay, outcome = settings.draw()
+            time.sleep(delay)
+
+            if outcome == "error":
+                self._send_json(500, {"error": {"message": "Mock server error", "type": "server_error"}})
+                return
+            if outcome == "rate_limit":
+                self._send_json(429, {"error": {"message": "Mock rate limit", "type": "rate_limit_error"}},
+                                {"retry-after-ms": "200"})
+                return
+
+            prompt = body.get("messages", [{}])[-1].get("content", "")
+            content = settings.reply(prompt, outcome)
+            self._send_json(200, {
+                "id": f"mock-{settings.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {
+                    "prompt_tokens": len(prompt) // 4,
+                    "completion_tokens": len(content) // 4,
+                    "total_tokens": (len(prompt) + len(content)) // 4
+                }
+            })
+
+    return Handler
+
+
+class MockLLMServer:
+    """OpenAI-compatible chat completions server answering translation prompts, run in a background thread."""
+
+    def __init__(self, settings: MockSettings, host: str = "127.0.0.1", port: int = 0):
+        self.settings = settings
+        self._server = ThreadingHTTPServer((host, port), make_handler(settings))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def serve_forever(self):
+        """Serve in the current thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def start(self):
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a mock OpenAI-compatible LLM server for offline testing.")
+    parser.add_argument("--port", type=int, default=8089, help="Port to listen on.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mean response time in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Uniform spread of the response time in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of an HTTP 500 response.")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probability of an HTTP 429 response.")
+    parser.add_argument("--mismatch-rate", type=float, default=0.0, help="Probability of a reply with the wrong line count.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the failure generator.")
+    args = parser.parse_args()
+
+    settings = MockSettings(args.latency, args.jitter, args.error_rate, args.rate_limit_rate, args.mismatch_rate, args.seed)
+    server = MockLLMServer(settings, port=args.port)
+    print(f"Mock LLM server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
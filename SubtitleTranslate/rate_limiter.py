@@ -0,0 +1,116 @@
+import re
+import time
+import random
+import asyncio
+import logging
+import email.utils
+
+
+def backoff_delay(attempt: int, base: float = 2.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter: a random delay in [0, min(cap, base * 2^(attempt-1))]."""
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+
+def parse_retry_after(error: Exception):
+    """Return how many seconds the server asked us to wait in a 429 *error*, or None if it didn't say.
+
+    Looks at the ``retry-after-ms`` and ``retry-after`` headers first (seconds or
+    an HTTP date), then at the ``retryDelay`` Gemini puts in the error body.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            try:
+                retry_date = email.utils.parsedate_to_datetime(retry_after)
+                return max(0.0, retry_date.timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    # Gemini: {"error": {"details": [{"@type": "...RetryInfo", "retryDelay": "12s"}]}}
+    match = re.search(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", str(error))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+class _TokenBucket:
+    """Bucket holding up to *per_minute* units, refilled continuously at per_minute / 60 units per second."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+
+    def refill(self, rate_factor: float = 1.0):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.capacity * rate_factor / 60.0)
+        self._updated = now
+
+    def wait_time(self, amount: float, rate_factor: float = 1.0) -> float:
+        """Seconds until *amount* units are available (0 if they are now)."""
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60.0 / (self.capacity * rate_factor)
+
+
+class RateLimiter:
+    """Request scheduler enforcing requests-per-minute and tokens-per-minute budgets.
+
+    A budget of 0 disables that limit. When the server answers with a rate
+    limit error, :meth:`pause` holds every caller back for the delay it asked
+    for, and the refill rate is lowered a little; it then recovers slowly on
+    each successful request, so the throughput settles just below the quota
+    instead of oscillating between bursts and failures.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self._requests = _TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = _TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._rate_factor = 1.0
+        self._paused_until = 0.0
+        # Held while waiting, so callers are served in arrival order
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, estimated_tokens: int = 0):
+        """Wait until a request estimated at *estimated_tokens* fits the budgets, then reserve it."""
+        async with self._lock:
+            while True:
+                delay = self._paused_until - time.monotonic()
+                for bucket, amount in ((self._requests, 1), (self._tokens, estimated_tokens)):
+                    if bucket is not None:
+                        bucket.refill(self._rate_factor)
+                        delay = max(delay, bucket.wait_time(amount, self._rate_factor))
+
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+
+            if self._requests is not None:
+                self._requests.level -= 1
+            if self._tokens is not None:
+                self._tokens.level -= min(estimated_tokens, self._tokens.capacity)
+
+    def record_success(self, estimated_tokens: int = 0, actual_tokens=None):
+        """Correct the token budget with the real usage and slowly restore the full rate."""
+        if self._tokens is not None and actual_tokens is not None:
+            self._tokens.level -= actual_tokens - min(estimated_tokens, self._tokens.capacity)
+        self._rate_factor = min(1.0, self._rate_factor + 0.02)
+
+    def pause(self, delay: float):
+        """Hold back every caller for *delay* seconds and lower the refill rate after a rate limit error."""
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        self._rate_factor = max(0.1, self._rate_factor * 0.8)
+        logging.info(f"Rate limited: pausing requests for {delay:.1f}s (rate at {self._rate_factor:.0%} of the budget).")
@@ -0,0 +1,178 @@
+import re
+import codecs
+from collections import deque
+
+# "00:01:02,345 --> 00:01:04,000" with optional cue settings after the end time.
+# Hours may have 1+ digits and '.' is accepted as the milliseconds separator.
+_TIMESTAMP_RE = re.compile(
+    r"^\s*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})\s*-->\s*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})\s*(.*)$"
+)
+
+
+def parse_timestamp(hours: str, minutes: str, seconds: str, millis: str) -> int:
+    """Convert the parts of an SRT timestamp to integer milliseconds."""
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis.ljust(3, "0"))
+
+
+def format_timestamp(ms: int) -> str:
+    """Format integer milliseconds as an SRT timestamp (HH:MM:SS,mmm)."""
+    seconds, millis = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{millis:03d}"
+
+
+class SubtitleBlock:
+    """A single SRT cue.
+
+    *number* is the cue number found in the file (None if it was missing or
+    not numeric) and *index* its 0-based position in the file. *raw* is only
+    set for text that could not be parsed as a cue, which is written back
+    unchanged.
+    """
+
+    __slots__ = ("index", "number", "start_ms", "end_ms", "settings", "text", "translated", "raw")
+
+    def __init__(self, index: int, number=None, start_ms: int = 0, end_ms: int = 0, settings: str = "",
+                 text: str = "", raw=None):
+        self.index = index
+        self.number = number
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.settings = settings
+        self.text = text
+        self.translated = None
+        self.raw = raw
+
+    @property
+    def timestamp(self) -> str:
+        line = f"{format_timestamp(self.start_ms)} --> {format_timestamp(self.end_ms)}"
+        return f"{line} {self.settings}" if self.settings else line
+
+    def format(self, text=None) -> str:
+        """Return the block as SRT text (without the trailing blank line), with *text* replacing the cue text."""
+        if self.raw is not None:
+            return self.raw
+        number = self.number if self.number is not None else self.index + 1
+        text = self.text if text is None else text
+        return f"{number}\n{self.timestamp}\n{text}" if text else f"{number}\n{self.timestamp}"
+
+
+def parse_srt(lines):
+    """Parse SRT text from an iterable of lines, yielding :class:`SubtitleBlock` objects one at a time.
+
+    Cues are detected by their timestamp line rather than by blank lines, so
+    blank lines inside a cue are tolerated (and dropped from its text), and
+    missing, duplicated or non-numeric cue numbers don't break parsing. Text
+    that doesn't belong to any cue (e.g. before the first one) is yielded as
+    a raw block.
+    """
+    index = 0
+    current = None  # (number, start_ms, end_ms, settings) of the cue being read
+    pending = []  # Lines read since the last timestamp line
+
+    def text_of(buffered):
+        return "\n".join(line.strip() for line in buffered if line.strip())
+
+    for line in lines:
+        line = line.rstrip("\r\n")
+        match = _TIMESTAMP_RE.match(line)
+        if not match:
+            pending.append(line)
+            continue
+
+        # A numeric line right before the timestamp is the new cue's number if a blank line precedes it,
+        # or if it follows the previous cue's number (files with the blank line between cues missing)
+        number = None
+        if pending and pending[-1].strip().isdigit():
+            candidate = int(pending[-1].strip())
+            previous_number = None
+            if current is not None:
+                previous_number = current[0] if current[0] is not None else index + 1
+            if (len(pending) == 1 or not pending[-2].strip()
+                    or (previous_number is not None and candidate == previous_number + 1)):
+                number = candidate
+                pending.pop()
+
+        if current is not None:
+            yield SubtitleBlock(index, *current, text=text_of(pending))
+            index += 1
+        elif any(l.strip() for l in pending):
+            yield SubtitleBlock(index, raw="\n".join(pending).strip())
+            index += 1
+
+        groups = match.groups()
+        current = (number, parse_timestamp(*groups[0:4]), parse_timestamp(*groups[4:8]), groups[8].strip())
+        pending = []
+
+    if current is not None:
+        yield SubtitleBlock(index, *current, text=text_of(pending))
+    elif any(l.strip() for l in pending):
+        yield SubtitleBlock(index, raw="\n".join(pending).strip())
+
+
+def detect_encoding(path: str) -> str:
+    """Return the encoding to read *path* with: 'utf-8-sig' if it decodes as UTF-8, otherwise 'latin-1'.
+
+    The file is decoded in chunks, so memory use doesn't depend on its size.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(1024 * 1024)
+                if not chunk:
+                    decoder.decode(b"", final=True)
+                    break
+                decoder.decode(chunk)
+    except UnicodeDecodeError:
+        return "latin-1"
+    return "utf-8-sig"
+
+
+def iter_srt_file(path: str, encoding=None):
+    """Stream the blocks of the SRT file at *path* (line endings normalized, BOM stripped)."""
+    encoding = encoding or detect_encoding(path)
+    with open(path, "r", encoding=encoding) as f:
+        yield from parse_srt(f)
+
+
+def count_srt_blocks(path: str, encoding=None) -> int:
+    """Count the blocks of *path* without keeping them in memory."""
+    return sum(1 for _ in iter_srt_file(path, encoding))
+
+
+class BlockWindow:
+    """Index-based access to a stream of blocks, keeping in memory only a sliding window of them.
+
+    Blocks are read from *blocks* on demand by :meth:`get`; :meth:`release`
+    drops every block before a given index once it's no longer needed.
+    """
+
+    def __init__(self, blocks, on_load=None):
+        self._blocks = iter(blocks)
+        self._window = deque()
+        self._offset = 0  # Index of the first block in the window
+        self._on_load = on_load
+
+    def get(self, index: int):
+        """Return the block at *index*, or None if the stream ends before it."""
+        if index < self._offset:
+            raise IndexError(f"Block {index} was already released from the window")
+        while index >= self._offset + len(self._window):
+            block = next(self._blocks, None)
+            if block is None:
+                return None
+            if self._on_load is not None:
+                self._on_load(block)
+            self._window.append(block)
+        return self._window[index - self._offset]
+
+    def release(self, before: int):
+        """Forget every block with an index lower than *before*."""
+        while self._offset < before:
+            if self._window:
+                self._window.popleft()
+            elif next(self._blocks, None) is None:
+                break
+            self._offset += 1
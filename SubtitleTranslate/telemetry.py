@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import math
+
+# Why a request had to be sent again
+RETRY_CAUSES = ("empty", "stripped_empty", "line_mismatch", "exception", "rate_limited", "batch_resend")
+
+# Upper bounds (seconds) of the request latency histogram exported to Prometheus
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+def _percentile(sorted_values: list, fraction: float):
+    """Nearest-rank percentile of an already sorted list (None if it's empty)."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return round(sorted_values[rank - 1], 3)
+
+
+class TranslationStats:
+    """Counters describing the LLM requests and blocks of one file, or of a whole run.
+
+    Request latencies are kept individually for the per-file percentiles and
+    as histogram counts, which is all the run-level totals keep so a
+    long-running watcher doesn't grow without bound.
+    """
+
+    def __init__(self, name: str = "", keep_latencies: bool = True):
+        self.name = name
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+        self.files = 0
+        self.calls = 0
+        self.failed_calls = 0
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.latencies = [] if keep_latencies else None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.retries = dict.fromkeys(RETRY_CAUSES, 0)
+        self.lines_repaired = 0
+        self.blocks_translated = 0
+        self.blocks_from_memory = 0
+        self.blocks_from_journal = 0
+        self.blocks_deduplicated = 0
+        self.requests_by_endpoint = {}
+
+    def record_call(self, latency: float, usage=None, failed: bool = False, endpoint: str = None):
+        """Record one request to the LLM, with the token ``usage`` of its response if any."""
+        self.calls += 1
+        if endpoint is not None:
+            self.requests_by_endpoint[endpoint] = self.requests_by_endpoint.get(endpoint, 0) + 1
+        if failed:
+            self.failed_calls += 1
+        self.latency_sum += latency
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.latency_buckets[i] += 1
+        if self.latencies is not None:
+            self.latencies.append(latency)
+        if usage is not None:
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+            # Prompt tokens served from the provider's prompt cache, when it reports them
+            details = getattr(usage, "prompt_tokens_details", None)
+            self.cached_prompt_tokens += getattr(details, "cached_tokens", 0) or 0
+
+    def record_retry(self, cause: str):
+        self.retries[cause] = self.retries.get(cause, 0) + 1
+
+    def finish(self):
+        """Freeze the elapsed time of a file once it's done."""
+        self.elapsed = time.monotonic() - self.started
+        self.files = 1
+
+    def merge(self, other: "TranslationStats"):
+        """Add the counters of a finished file to these run-level totals."""
+        self.elapsed += other.elapsed
+        self.files += other.files
+        self.calls += other.calls
+        self.failed_calls += other.failed_calls
+        self.latency_sum += other.latency_sum
+        self.latency_buckets = [a + b for a, b in zip(self.latency_buckets, other.latency_buckets)]
+        if self.latencies is not None and other.latencies is not None:
+            self.latencies.extend(other.latencies)
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cached_prompt_tokens += other.cached_prompt_tokens
+        for cause, count in other.retries.items():
+            self.retries[cause] = self.retries.get(cause, 0) + count
+        self.lines_repaired += other.lines_repaired
+        self.blocks_translated += other.blocks_translated
+        self.blocks_from_memory += other.blocks_from_memory
+        self.blocks_from_journal += other.blocks_from_journal
+        self.blocks_deduplicated += other.blocks_deduplicated
+        for endpoint, count in other.requests_by_endpoint.items():
+            self.requests_by_endpoint[endpoint] = self.requests_by_endpoint.get(endpoint, 0) + count
+
+    def estimated_cost(self, input_price: float, output_price: float) -> float:
+        """Cost of the tokens used, given prices per million input / output tokens."""
+        return (self.prompt_tokens * input_price + self.completion_tokens * output_price) / 1_000_000
+
+    def summary(self, input_price: float = 0.0, output_price: float = 0.0) -> dict:
+        """JSON-serializable summary of the counters."""
+        elapsed = self.elapsed or (time.monotonic() - self.started)
+        blocks = self.blocks_translated + self.blocks_from_memory + self.blocks_from_journal + self.blocks_deduplicated
+        latencies = sorted(self.latencies) if self.latencies is not None else []
+        return {
+            "name": self.name,
+            "elapsed_seconds": round(elapsed, 3),
+            "blocks": {
+                "translated": self.blocks_translated,
+                "from_memory": self.blocks_from_memory,
+                "from_journal": self.blocks_from_journal,
+                "deduplicated": self.blocks_deduplicated,
+                "per_minute": round(60.0 * blocks / elapsed, 2) if elapsed > 0 else None,
+            },
+            "requests": {
+                "total": self.calls,
+                "failed": self.failed_calls,
+                "by_endpoint": dict(self.requests_by_endpoint),
+                "latency_seconds": {
+                    "mean": round(self.latency_sum / self.calls, 3) if self.calls else None,
+                    "p50": _percentile(latencies, 0.50),
+                    "p90": _percentile(latencies, 0.90),
+                    "p99": _percentile(latencies, 0.99),
+                    "max": round(latencies[-1], 3) if latencies else None,
+                },
+            },
+            "retries": dict(self.retries),
+            "lines_repaired": self.lines_repaired,
+            "tokens": {
+                "prompt": self.prompt_tokens,
+                "completion": self.completion_tokens,
+                "cached_prompt": self.cached_prompt_tokens,
+            },
+            "estimated_cost": round(self.estimated_cost(input_price, output_price), 6),
+        }
+
+    def write_json(self, path: str, input_price: float = 0.0, output_price: float = 0.0):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(input_price, output_price), f, indent=2)
+            f.write("\n")
+
+    def write_prometheus(self, path: str, labels: dict, input_price: float = 0.0, output_price: float = 0.0):
+        """Export the counters in the Prometheus text format, for the node_exporter textfile collector.
+
+        The file is written to a temporary path and renamed, so the collector
+        never reads it half-written.
+        """
+        label_str = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+
+        def sample(name, value, extra=""):
+            all_labels = ",".join(filter(None, [label_str, extra]))
+            return f"{name}{{{all_labels}}} {value}"
+
+        lines = [
+            "# HELP subtitle_translate_files_total Subtitle files translated.",
+            "# TYPE subtitle_translate_files_total counter",
+            sample("subtitle_translate_files_total", self.files),
+            "# HELP subtitle_translate_blocks_total Subtitle blocks completed, by source.",
+            "# TYPE subtitle_translate_blocks_total counter",
+            sample("subtitle_translate_blocks_total", self.blocks_translated, 'source="llm"'),
+            sample("subtitle_translate_blocks_total", self.blocks_from_memory, 'source="memory"'),
+            sample("subtitle_translate_blocks_total", self.blocks_from_journal, 'source="journal"'),
+            sample("subtitle_translate_blocks_total", self.blocks_deduplicated, 'source="duplicate"'),
+            "# HELP subtitle_translate_requests_total LLM requests sent.",
+            "# TYPE subtitle_translate_requests_total counter",
+            sample("subtitle_translate_requests_total", self.calls),
+            "# HELP subtitle_translate_endpoint_requests_total LLM requests sent, by endpoint.",
+            "# TYPE subtitle_translate_endpoint_requests_total counter",
+        ]
+        for endpoint, count in sorted(self.requests_by_endpoint.items()):
+            lines.append(sample("subtitle_translate_endpoint_requests_total", count, f'endpoint="{endpoint}"'))
+        lines += [
+            "# HELP subtitle_translate_request_failures_total LLM requests that raised an error.",
+            "# TYPE subtitle_translate_request_failures_total counter",
+            sample("subtitle_translate_request_failures_total", self.failed_calls),
+            "# HELP subtitle_translate_request_latency_seconds LLM request latency.",
+            "# TYPE subtitle_translate_request_latency_seconds histogram",
+        ]
+        for bound, count in zip(LATENCY_BUCKETS, self.latency_buckets):
+            lines.append(sample("subtitle_translate_request_latency_seconds_bucket", count, f'le="{bound}"'))
+        lines += [
+            sample("subtitle_translate_request_latency_seconds_bucket", self.calls, 'le="+Inf"'),
+            sample("subtitle_translate_request_latency_seconds_sum", round(self.latency_sum, 6)),
+            sample("subtitle_translate_request_latency_seconds_count", self.calls),
+            "# HELP subtitle_translate_retries_total Requests sent again, by cause.",
+            "# TYPE subtitle_translate_retries_total counter",
+        ]
+        for cause, count in sorted(self.retries.items()):
+            lines.append(sample("subtitle_translate_retries_total", count, f'cause="{cause}"'))
+        lines += [
+            "# HELP subtitle_translate_lines_repaired_total Line count mismatches repaired without a full retry.",
+            "# TYPE subtitle_translate_lines_repaired_total counter",
+            sample("subtitle_translate_lines_repaired_total", self.lines_repaired),
+            "# HELP subtitle_translate_tokens_total Tokens reported by the LLM, by type.",
+            "# TYPE subtitle_translate_tokens_total counter",
+            sample("subtitle_translate_tokens_total", self.prompt_tokens, 'type="prompt"'),
+            sample("subtitle_translate_tokens_total", self.completion_tokens, 'type="completion"'),
+            sample("subtitle_translate_tokens_total", self.cached_prompt_tokens, 'type="cached_prompt"'),
+            "# HELP subtitle_translate_estimated_cost_total Estimated cost of the tokens used.",
+            "# TYPE subtitle_translate_estimated_cost_total counter",
+            sample("subtitle_translate_estimated_cost_total", round(self.estimated_cost(input_price, output_price), 6)),
+        ]
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
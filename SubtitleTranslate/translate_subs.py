@@ -1,11 +1,20 @@
 import os
+import re
 import json
 import logging
+import glob
 import argparse
 import concurrent.futures
+import itertools
 import time
-import urllib.request
+import threading
 import urllib.parse
+from collections import deque
+
+from srt_parser import count_srt_blocks, detect_encoding, iter_srt_file
+from http_pool import HTTPConnectionPool
+from adaptive_concurrency import AdaptiveConcurrency
+from translation_memory import TranslationMemory
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -30,101 +39,434 @@ def load_config():
 # Initialize configuration
 CONFIG = load_config()
 
-def translate_google(text, target_lang='pt-PT'):
-    """Translate text using the Google Translate direct URL."""
-    if not text.strip():
-        return ""
+# Keep-alive connections to Google Translate, the concurrency limit and the translation cache,
+# shared by every worker thread
+_GOOGLE_POOL = None
+_CONCURRENCY = None
+_CACHE = None
+_CACHE_OPENED = False
+_SHARED_LOCK = threading.Lock()
+
+def _concurrency_settings():
+    concurrency_cfg = CONFIG.get("google_translate", {}).get("concurrency", {})
+    return concurrency_cfg.get("initial", 8), concurrency_cfg.get("min", 1), concurrency_cfg.get("max", 32)
+
+def google_pool():
+    """Return the shared connection pool to the Google Translate endpoint, creating it on first use."""
+    global _GOOGLE_POOL
+    with _SHARED_LOCK:
+        if _GOOGLE_POOL is None:
+            google_cfg = CONFIG.get("google_translate", {})
+            _GOOGLE_POOL = HTTPConnectionPool(
+                google_cfg.get("base_url", "https://translate.googleapis.com"),
+                max_connections=google_cfg.get("max_connections", _concurrency_settings()[2]),
+                timeout=google_cfg.get("timeout", 5)
+            )
+        return _GOOGLE_POOL
+
+def concurrency_limit():
+    """Return the shared adaptive limit on Google Translate requests in flight, creating it on first use."""
+    global _CONCURRENCY
+    with _SHARED_LOCK:
+        if _CONCURRENCY is None:
+            initial, minimum, maximum = _concurrency_settings()
+            _CONCURRENCY = AdaptiveConcurrency(initial, minimum, maximum)
+        return _CONCURRENCY
 
+def translation_cache():
+    """Return the shared on-disk cache of translations if enabled in config, otherwise None."""
+    global _CACHE, _CACHE_OPENED
+    with _SHARED_LOCK:
+        if not _CACHE_OPENED:
+            _CACHE_OPENED = True
+            cache_cfg = CONFIG.get("google_translate", {}).get("cache", {})
+            if cache_cfg.get("enabled", False):
+                path = cache_cfg.get("path", "google_cache.db")
+                if not os.path.isabs(path):
+                    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+                max_age_days = cache_cfg.get("max_age_days", 30)
+                try:
+                    _CACHE = TranslationMemory(
+                        path,
+                        max_entries=int(cache_cfg.get("max_entries", 200000)),
+                        max_age=max_age_days * 86400 if max_age_days else None,
+                        memory_entries=int(cache_cfg.get("memory_entries", 5000))
+                    )
+                except Exception as e:
+                    logging.warning(f"Failed to open translation cache at {path}: {e}. Continuing without it.")
+        return _CACHE
+
+def close_translation_cache():
+    """Log the cache statistics of the run and close the cache."""
+    global _CACHE, _CACHE_OPENED
+    with _SHARED_LOCK:
+        cache, _CACHE, _CACHE_OPENED = _CACHE, None, False
+    if cache is None:
+        return
+    stats = cache.stats()
+    logging.info(
+        f"Translation cache: {stats['hits']} hits ({stats['memory_hits']} from memory), {stats['misses']} misses, "
+        f"{stats['expired']} expired ({(stats['hit_rate'] or 0):.1%} hit rate)."
+    )
+    cache.close()
+
+def _google_lang_code(target_lang):
     # Ensure we use a direct language code if possible
     # (Simple mapping for this specific script's context)
     lang_code = "pt-PT" if "pt-PT" in target_lang.lower() else "pt"
     if "en" in target_lang.lower(): lang_code = "en" # Fallback/debug
+    return lang_code
 
-    url = f'https://translate.googleapis.com/translate_a/single?client=gtx&sl=en&tl={lang_code}&dt=t&q=' + urllib.parse.quote(text)
-    req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
+def _google_request(text, target_lang):
+    """Send *text* to Google Translate, with retries; return the translation, or None if every attempt failed."""
+    path = f'/translate_a/single?client=gtx&sl=en&tl={_google_lang_code(target_lang)}&dt=t&q=' + urllib.parse.quote(text)
 
     for attempt in range(3):
+        token = concurrency_limit().acquire()
+        outcome = "error"
         try:
-            with urllib.request.urlopen(req, timeout=5) as response:
-                res = json.loads(response.read().decode('utf-8'))
-                # Google Translate returns a list of parts; join the first element of each part
-                return ''.join([x[0] for x in res[0]])
+            status, _, body = google_pool().get(path, headers={'User-Agent': 'Mozilla/5.0'})
+            if status in (429, 503):
+                outcome = "throttled"
+            if status != 200:
+                raise RuntimeError(f"HTTP {status}")
+            res = json.loads(body.decode('utf-8'))
+            outcome = "ok"
+            # Google Translate returns a list of parts; join the first element of each part
+            return ''.join([x[0] for x in res[0]])
         except Exception as e:
             logging.warning(f"Google Translate error (attempt {attempt + 1}/3): {e}")
-            time.sleep(1) # Retry backoff
+        finally:
+            concurrency_limit().release(token, outcome)
+        time.sleep(1) # Retry backoff
+
+    return None
+
+def translate_google(text, target_lang='pt-PT'):
+    """Translate text using the Google Translate direct URL."""
+    if not text.strip():
+        return ""
+
+    translated = _translate_batch([text], target_lang)[0]
+    return translated if translated is not None else text
+
+# Line separating the cues of a batch; Google leaves the bracketed number untouched
+_BATCH_MARKER = "[[{}]]"
+_BATCH_MARKER_RE = re.compile(r"^\s*\[\s*\[\s*(\d+)\s*\]\s*\]\s*$")
+
+def _join_batch(texts):
+    return "\n".join(f"{_BATCH_MARKER.format(i)}\n{text}" for i, text in enumerate(texts))
+
+def _split_batch(translated, count):
+    """Split a translated batch back into *count* cue texts using the marker lines (None for missing cues)."""
+    parts = {}
+    current = None
+    for line in translated.splitlines():
+        match = _BATCH_MARKER_RE.match(line)
+        if match:
+            current = int(match.group(1))
+            parts[current] = [] if current < count and current not in parts else None
             continue
+        if current is not None and parts.get(current) is not None and line.strip():
+            parts[current].append(line.strip())
+    return [("\n".join(parts[i]) if parts.get(i) else None) for i in range(count)]
 
-    return text
+def _translate_batch(texts, target_lang):
+    """Translate *texts*, several per request; returns the translations, None for cues every attempt failed on.
 
-def process_block(b, target_lang):
-    """Parses an SRT block, translates it, and returns the formatted block."""
-    lines = b.split('\n')
-    if len(lines) >= 3:
-        try:
-            block_num = lines[0].strip()
-            timestamp = lines[1].strip()
-            text_lines = "\n".join(lines[2:]).strip()
+    Cues found in the translation cache are not sent, and the ones
+    translated are added to it.
+    """
+    cache = translation_cache()
+    cache_key = ("en", _google_lang_code(target_lang))
+    results = [None] * len(texts)
+    to_send = []
+    for i, text in enumerate(texts):
+        if not text.strip():
+            results[i] = ""
+            continue
+        cached = cache.get(text, *cache_key) if cache else None
+        if cached is not None:
+            results[i] = cached
+        else:
+            to_send.append(i)
 
-            if not text_lines:
-                return b
+    for i, translated in zip(to_send, _request_batch([texts[i] for i in to_send], target_lang)):
+        results[i] = translated
+        if cache and translated is not None:
+            cache.put(texts[i], translated, *cache_key)
+    return results
 
-            # Translate the subtitle textual part
-            translated_text = translate_google(text_lines, target_lang)
-            return f"{block_num}\n{timestamp}\n{translated_text}"
-        except Exception as e:
-            logging.error(f"Error processing block: {e}")
-            return b
-    else:
-        # Return malformed blocks as-is
-        return b
+def _request_batch(texts, target_lang):
+    """Send *texts* to Google Translate, joined in one request; cues that don't come back intact are re-sent alone."""
+    if len(texts) <= 1:
+        return [_google_request(text, target_lang) for text in texts]
+
+    translated = _google_request(_join_batch(texts), target_lang)
+    parts = _split_batch(translated, len(texts)) if translated is not None else [None] * len(texts)
+
+    results = []
+    one_by_one = 0
+    for text, part in zip(texts, parts):
+        if part is not None and len(part.splitlines()) == len(text.splitlines()):
+            results.append(part)
+        else:
+            one_by_one += 1
+            results.append(_google_request(text, target_lang))
+    if one_by_one:
+        logging.warning(f"{one_by_one} of {len(texts)} cues of a batch were translated one by one.")
+    return results
+
+def iter_batches(blocks, batch_size, max_query_chars):
+    """Group a stream of consecutive blocks into batches of at most *batch_size* cues with text.
+
+    The URL-encoded text of a batch is also kept under *max_query_chars*.
+    Blocks without text stay in the batch they come in, they are written back
+    unchanged.
+    """
+    current = []
+    cues = 0
+    current_size = 0
+    for block in blocks:
+        if block.text:
+            size = len(urllib.parse.quote(f"{_BATCH_MARKER.format(cues)}\n{block.text}\n"))
+            if cues and (cues >= batch_size or current_size + size > max_query_chars):
+                yield current
+                current = []
+                cues = 0
+                current_size = 0
+            cues += 1
+            current_size += size
+        current.append(block)
+    if current:
+        yield current
+
+def process_batch(batch, target_lang):
+    """Translate the parsed SRT blocks of *batch*.
 
-def translate_file(srt_path, target_lang, output_suffix):
+    Returns the blocks formatted as SRT text and how many of them were left
+    in the source language because every attempt to translate them failed.
+    """
+    cues = [b for b in batch if b.text]
+    try:
+        translated = dict(zip(cues, _translate_batch([b.text for b in cues], target_lang))) if cues else {}
+    except Exception as e:
+        logging.error(f"Error processing batch: {e}")
+        return [b.format() for b in batch], len(cues)
+
+    fallbacks = sum(1 for t in translated.values() if t is None)
+    return [b.format(translated.get(b) or b.text) for b in batch], fallbacks
+
+def _resume_index(srt_path, output_path, encoding):
+    """Number of blocks already written to a partial *output_path*, 0 if there is none or it doesn't match the source."""
+    if not os.path.exists(output_path):
+        return 0
+    try:
+        last_written = deque(iter_srt_file(output_path, "utf-8-sig"), maxlen=1)
+        if not last_written:
+            return 0
+        written = last_written[0].index + 1
+        source_block = next(itertools.islice(iter_srt_file(srt_path, encoding), written - 1, None), None)
+    except Exception as e:
+        logging.warning(f"Failed to read existing content: {e}")
+        return 0
+
+    if source_block is None or source_block.timestamp != last_written[0].timestamp:
+        logging.warning(f"{output_path} doesn't match {srt_path}; translating it again from the start.")
+        return 0
+    return written
+
+def translate_file(srt_path, target_lang, output_suffix, batch_size=None, executor=None, stop_event=None):
+    """Translate *srt_path*, writing the output next to it.
+
+    The requests run on *executor* when given, so several files can share
+    one pool, otherwise on a pool of the file's own. Setting *stop_event*
+    interrupts the file as Ctrl+C would. Returns a summary of
+    the file (blocks, cues translated, cues left in the source language,
+    seconds), or None if it could not be translated.
+    """
     if not os.path.exists(srt_path):
         logging.error(f"Input file not found: {srt_path}")
-        return
+        return None
 
     logging.info(f"Processing subtitle file: {srt_path}")
-    try:
-        with open(srt_path, 'r', encoding='utf-8') as f:
-            text = f.read()
-    except UnicodeDecodeError:
-        logging.warning(f"UTF-8 decoding failed for {srt_path}. Retrying with latin-1...")
-        with open(srt_path, 'r', encoding='latin-1') as f:
-            text = f.read()
-
-    # Normalise line endings and strip UTF-8 BOM
-    text = text.lstrip('\ufeff').replace('\r\n', '\n').replace('\r', '\n')
-    blocks = text.strip().split('\n\n')
-    logging.info(f"Total blocks found: {len(blocks)}")
-
-    results = [None] * len(blocks)
-
-    # Utilize ThreadPoolExecutor to translate blocks in multithreading mode efficiently
-    # Google Translate has stricter rate limits than some APIs, but 20-30 threads usually works okay for small files.
-    max_workers = 30
-
-    logging.info(f"Translating with {max_workers} threads...")
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(process_block, b, target_lang): i for i, b in enumerate(blocks)}
-        for future in concurrent.futures.as_completed(futures):
-            i = futures[future]
-            results[i] = future.result()
+    # Line endings, BOM and encoding (UTF-8, falling back to latin-1) are handled by the parser
+    encoding = detect_encoding(srt_path)
+    total_blocks = count_srt_blocks(srt_path, encoding)
+    logging.info(f"Total blocks found: {total_blocks}")
 
     output_path = srt_path.replace(".srt", f"{output_suffix}.srt")
 
-    # Write reconstructed blocks into output file
+    # Blocks are written as soon as every earlier one is done, so an interrupted run resumes after the last one
+    start_index = _resume_index(srt_path, output_path, encoding)
+    summary = {"path": srt_path, "blocks": total_blocks, "resumed_from": start_index, "cues": 0, "fallbacks": 0,
+               "seconds": 0.0}
+    if start_index >= total_blocks:
+        logging.info(f"All blocks in {srt_path} are already translated.")
+        return summary
+    if start_index:
+        logging.info(f"Found {start_index} already translated blocks. Resuming from block {start_index + 1}.")
+
+    google_cfg = CONFIG.get("google_translate", {})
+    batch_size = max(1, int(batch_size or google_cfg.get("batch_size", 1)))
+    blocks = itertools.islice(iter_srt_file(srt_path, encoding), start_index, None)
+    batches = iter_batches(blocks, batch_size, google_cfg.get("max_query_chars", 5000))
+
+    # The worker threads only send a request when the adaptive concurrency limit allows it: the limit
+    # grows while Google answers quickly and is cut down as soon as it throttles us.
+    limit = concurrency_limit()
+    stats_before = limit.stats()
+    started = time.monotonic()
+    cues = 0
+    fallbacks = 0
+    written = start_index
+
+    # Batches submitted ahead of the first one not yet written; bounds memory however long the file is
+    max_pending = 2 * limit.maximum
+    pending = deque()
+
+    def write_next(f):
+        nonlocal fallbacks, written
+        if stop_event is not None and stop_event.is_set():
+            raise KeyboardInterrupt
+        batch, future = pending.popleft()
+        formatted_blocks, batch_fallbacks = future.result()
+        fallbacks += batch_fallbacks
+        f.write("".join(formatted + "\n\n" for formatted in formatted_blocks))
+        f.flush()
+        written += len(batch)
+
+    own_executor = executor is None
+    if own_executor:
+        logging.info(f"Translating with up to {limit.maximum} threads, starting at {int(limit.limit)} requests at once...")
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=limit.maximum)
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write("\n\n".join(results) + "\n")
-        logging.info(f"Translation complete! Saved to {output_path}")
-    except Exception as e:
-        logging.error(f"Error writing output file: {e}")
+        with open(output_path, 'a' if start_index else 'w', encoding='utf-8') as f:
+            for batch in batches:
+                cues += sum(1 for b in batch if b.text)
+                pending.append((batch, executor.submit(process_batch, batch, target_lang)))
+                while pending and (len(pending) > max_pending or pending[0][1].done()):
+                    write_next(f)
+            while pending:
+                write_next(f)
+    except BaseException as e:
+        # Don't wait for the queued batches, they are translated again on resume
+        for _, future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if isinstance(e, Exception):
+            logging.error(f"Error writing output file: {e}")
+            return None
+        logging.info(f"Interrupted; {written} of {total_blocks} blocks were saved to {output_path}.")
+        raise
+    if own_executor:
+        executor.shutdown()
+
+    elapsed = time.monotonic() - started
+    stats = limit.stats()
+    logging.info(
+        f"Translated {cues} cues in {elapsed:.1f}s ({cues / elapsed if elapsed > 0 else 0:.1f} cues/s). "
+        f"Concurrency ended at {stats['limit']} (peak {stats['peak_limit']}), "
+        f"{stats['throttled'] - stats_before['throttled']} requests throttled, "
+        f"{stats['errors'] - stats_before['errors']} failed."
+    )
+    if fallbacks:
+        logging.warning(f"{fallbacks} cues could not be translated and were left in the source language.")
+
+    pool_stats = google_pool().stats()
+    logging.info(
+        f"HTTP requests: {pool_stats['requests']}, connections opened: {pool_stats['connections_opened']}, "
+        f"reused: {pool_stats['connections_reused']} ({(pool_stats['reuse_ratio'] or 0):.1%})."
+    )
+    logging.info(f"Translation complete! Saved to {output_path}")
+    summary.update(cues=cues, fallbacks=fallbacks, seconds=round(elapsed, 2))
+    return summary
+
+def find_srt_files(inputs, output_suffix, recursive=False):
+    """Expand files, directories and glob patterns into the subtitle files to translate.
+
+    Directories are searched for ``.srt`` files (including subdirectories
+    with *recursive*). Translations already labeled with *output_suffix*
+    and log files are skipped; duplicates are listed once.
+    """
+    clean_suffix = output_suffix.lower().lstrip('.')
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(glob.escape(item), "**", "*.srt") if recursive else os.path.join(glob.escape(item), "*.srt")
+            paths = sorted(glob.glob(pattern, recursive=recursive))
+        elif glob.has_magic(item):
+            paths = sorted(glob.glob(item, recursive=True))
+        else:
+            paths = [item]
+
+        for path in paths:
+            filename = os.path.basename(path).lower()
+            if not filename.endswith(".srt") or filename.startswith("log_"):
+                continue
+            # Outputs are named "<name><suffix>.srt", and the suffix doesn't have to start with a dot ("_translated")
+            if (f".{clean_suffix}." in filename or filename.endswith(f".{clean_suffix}.srt")
+                    or filename.endswith(f"{output_suffix.lower()}.srt")):
+                continue
+            if path not in found:
+                found.append(path)
+    return found
+
+def translate_files(srt_paths, target_lang, output_suffix, batch_size=None, parallel_files=2):
+    """Translate several files through one shared pool of worker threads.
+
+    *parallel_files* files are in progress at once, so the pool stays busy
+    while one of them waits for its slowest batch. A summary line per file
+    is logged at the end. Returns the summaries (None for failed files).
+    """
+    limit = concurrency_limit()
+    summaries = []
+    stop_event = threading.Event()
+    logging.info(
+        f"Translating {len(srt_paths)} files, {parallel_files} at a time, with up to {limit.maximum} threads..."
+    )
+    with concurrent.futures.ThreadPoolExecutor(max_workers=limit.maximum) as executor, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=max(1, parallel_files)) as files_executor:
+        futures = [
+            files_executor.submit(translate_file, path, target_lang, output_suffix, batch_size, executor, stop_event)
+            for path in srt_paths
+        ]
+        try:
+            for future in futures:
+                summaries.append(future.result())
+        except BaseException:
+            # Let the files in progress save what they have and stop
+            stop_event.set()
+            for future in futures:
+                future.cancel()
+            raise
+
+    logging.info("Summary:")
+    for path, summary in zip(srt_paths, summaries):
+        if summary is None:
+            logging.info(f"  {path}: FAILED")
+            continue
+        if summary["resumed_from"] >= summary["blocks"]:
+            logging.info(f"  {path}: already translated")
+            continue
+        status = f"{summary['cues']} cues in {summary['seconds']:.1f}s"
+        if summary["resumed_from"]:
+            status += f", resumed from block {summary['resumed_from'] + 1}"
+        if summary["fallbacks"]:
+            status += f", {summary['fallbacks']} left untranslated"
+        logging.info(f"  {path}: {summary['blocks']} blocks, {status}")
+    return summaries
 
 def main():
     parser = argparse.ArgumentParser(description="Translate SRT subtitles using Google Translate.")
-    parser.add_argument("srt_file", help="Path to the .srt file to translate.")
+    parser.add_argument("srt_file", nargs='+', help="Path of an .srt file to translate, a directory of them, or a glob pattern.")
     parser.add_argument("--target-lang", help="Target language code (e.g. pt-PT).")
     parser.add_argument("--suffix", help="Output file suffix.")
+    parser.add_argument("--batch-size", type=int, help="Cues sent per request (default: google_translate.batch_size, or 1).")
+    parser.add_argument("--recursive", action="store_true", help="Also look for .srt files in subdirectories.")
+    parser.add_argument("--parallel-files", type=int,
+                        help="Files translated at the same time (default: google_translate.parallel_files, or 2).")
 
     args = parser.parse_args()
 
@@ -133,9 +475,20 @@ def main():
     output_suffix = args.suffix or CONFIG.get("translation", {}).get("output_suffix", "_translated")
 
     try:
-        translate_file(args.srt_file, target_lang, output_suffix)
+        if len(args.srt_file) == 1 and os.path.isfile(args.srt_file[0]):
+            translate_file(args.srt_file[0], target_lang, output_suffix, args.batch_size)
+            return
+
+        srt_paths = find_srt_files(args.srt_file, output_suffix, args.recursive)
+        if not srt_paths:
+            logging.error("No subtitle files found.")
+            return
+        parallel_files = args.parallel_files or CONFIG.get("google_translate", {}).get("parallel_files", 2)
+        translate_files(srt_paths, target_lang, output_suffix, args.batch_size, parallel_files)
     except KeyboardInterrupt:
         logging.info("\nInterrupted by user. Exiting...")
+    finally:
+        close_translation_cache()
 
 if __name__ == "__main__":
     main()
@@ -1,13 +1,26 @@
 import os
+import re
 import json
+import asyncio
+import weakref
+import functools
+import contextvars
 import time
+from collections import OrderedDict, deque
 import logging
 import argparse
 import shutil
-from openai import OpenAI
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+import hashlib
+import threading
+
+from translation_memory import TranslationMemory, normalize_source
+from rate_limiter import RateLimiter, backoff_delay, parse_retry_after
+from endpoint_pool import Endpoint, EndpointPool
+import inotify_watch
+from checkpoint_journal import CheckpointJournal, file_hash, text_hash
+from srt_parser import BlockWindow, count_srt_blocks, detect_encoding, iter_srt_file
+from line_repair import repair_line_count
+from telemetry import TranslationStats
 
 # _USER_PROMPT_TEMPLATE = """Translate the subtitle block below from English to {target_lang}.
 # STRICT RULES:
@@ -45,10 +58,41 @@ _USER_PROMPT_TEMPLATE = """You are an expert audiovisual translator specializing
 ### INPUT DATA:
 {json_payload}"""
 
+# Batch variant of the prompt above: several consecutive subtitle blocks are sent in one request,
+# each identified by its `id`, and the reply is split back per block using the [[id]] markers.
+_BATCH_USER_PROMPT_TEMPLATE = """You are an expert audiovisual translator specializing in movie and television subtitles. Your task is to translate the specified subtitle blocks from English into {target_lang}.
+### STRICT INSTRUCTIONS:
+
+1. FORMATTING & OUTPUT:
+- For EVERY entry of the `blocks` array, in order, output a line containing ONLY its id wrapped in double square brackets (e.g. `[[{first_id}]]`), followed by the translated plain text of that block's `lines`.
+- DO NOT output JSON syntax, lists, quotes, labels, or conversational filler (e.g., "Here is the translation:").
+- PRESERVE EXACT LINES: Each translated block MUST contain the exact same number of lines as its original `lines` array. Do not merge or split subtitle lines, and do not move text between blocks.
+
+2. CONTEXT USAGE:
+- Read `previous_context` and `following_context` purely to understand the scene, tone, and continuity.
+- DO NOT translate or include any text from the context sections in your final output.
+
+3. LOCALIZATION & TONE:
+- Adapt slang, idioms, puns, and intentional misspellings into natural equivalents in {target_lang}.
+- Maintain the original tone, register, and character voice.
+
+4. GENDER & GRAMMAR:
+- Use the context to infer the correct grammatical gender for the speaker and the person being spoken to.
+- If the gender is ambiguous and cannot be guessed from the context, use gender-neutral phrasing in {target_lang} whenever possible, provided it sounds natural.
+
+### INPUT DATA:
+{json_payload}"""
+
+# Marker line that precedes each block of a batch reply, e.g. "[[3]]"
+_BATCH_MARKER_RE = re.compile(r"^\s*\[\[\s*(\d+)\s*\]\]\s*$")
+
 
 def load_config():
-    """Load configuration from config.json, falling back to config.example.json if not present."""
-    config_path = os.path.join(os.path.dirname(__file__), 'config.json')
+    """Load configuration from config.json, falling back to config.example.json if not present.
+
+    The SUBTITLE_TRANSLATE_CONFIG environment variable, if set, points to the config file to use instead.
+    """
+    config_path = os.environ.get("SUBTITLE_TRANSLATE_CONFIG") or os.path.join(os.path.dirname(__file__), 'config.json')
     example_path = os.path.join(os.path.dirname(__file__), 'config.example.json')
 
     if not os.path.exists(config_path):
@@ -62,12 +106,41 @@ def load_config():
     with open(path_to_load, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-# Initialize configuration
-try:
-    CONFIG = load_config()
-except Exception as e:
-    logging.error(f"Failed to load configuration: {e}")
-    exit(1)
+
+# Configuration and client settings are loaded on first use, so importing this module is cheap and has
+# no side effects. Use configure() to pass a configuration instead of reading config.json.
+_CONFIG = None
+_CLIENT_SETTINGS = None
+_INIT_LOCK = threading.Lock()
+
+
+def get_config() -> dict:
+    """Return the configuration, loading it with :func:`load_config` on first use."""
+    global _CONFIG
+    if _CONFIG is None:
+        with _INIT_LOCK:
+            if _CONFIG is None:
+                _CONFIG = load_config()
+    return _CONFIG
+
+
+def configure(config: dict = None):
+    """Use *config* (a dict with the layout of config.json) from now on, or reload config.json if None.
+
+    Clients already created with the previous settings are dropped.
+    """
+    global _CONFIG, _CLIENT_SETTINGS
+    with _INIT_LOCK:
+        _CONFIG = config
+        _CLIENT_SETTINGS = None
+        _LOOP_RESOURCES.clear()
+
+
+def __getattr__(name):
+    # Backward compatibility: CONFIG used to be a module attribute loaded at import time
+    if name == "CONFIG":
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def _strip_context_leakage(translated: str) -> str:
@@ -78,65 +151,293 @@ def _strip_context_leakage(translated: str) -> str:
     return "\n".join(cleaned).strip()
 
 
-def _get_client():
-    """Initialize and return the OpenAI client based on configuration."""
-    provider = CONFIG.get("llm_provider", "cloud")
+def _provider_settings(provider: str):
+    """Return the AsyncOpenAI client arguments and model name of *provider* ("local" or "cloud")."""
     if provider == "local":
-        local_cfg = CONFIG.get("local", {})
-        return OpenAI(
-            api_key=local_cfg.get("api_key", ""),
-            base_url=local_cfg.get("base_url", "http://localhost:1234/v1"),
-            timeout=30.0  # Add a 30s timeout to prevent indefinite blocking
-        ), local_cfg.get("model_name"), "local"
+        local_cfg = get_config().get("local", {})
+        return {
+            "api_key": local_cfg.get("api_key", ""),
+            "base_url": local_cfg.get("base_url", "http://localhost:1234/v1"),
+            "timeout": 30.0,  # Add a 30s timeout to prevent indefinite blocking
+            "max_retries": 0  # Retries and rate limit backoff are handled by _create_completion / translate_llm_async
+        }, local_cfg.get("model_name")
     else:
-        cloud_cfg = CONFIG.get("cloud", {})
-        return OpenAI(
-            api_key=cloud_cfg.get("api_key"),
-            base_url=cloud_cfg.get("base_url", "https://generativelanguage.googleapis.com/v1beta/openai/"),
-            timeout=60.0  # Cloud calls might take longer but still need a timeout
-        ), cloud_cfg.get("model_name", "gemma-4-26b-a4b-it"), "cloud"
+        cloud_cfg = get_config().get("cloud", {})
+        return {
+            "api_key": cloud_cfg.get("api_key"),
+            "base_url": cloud_cfg.get("base_url", "https://generativelanguage.googleapis.com/v1beta/openai/"),
+            "timeout": 60.0,  # Cloud calls might take longer but still need a timeout
+            "max_retries": 0
+        }, cloud_cfg.get("model_name", "gemma-4-26b-a4b-it")
 
 
-# Shared client to avoid repeated initializations
-try:
-    _CLIENT, _MODEL_NAME, _PROVIDER = _get_client()
-except Exception as e:
-    logging.error(f"Failed to initialize LLM client: {e}")
-    exit(1)
+def _get_client_settings():
+    """Return the AsyncOpenAI client arguments, model name and provider based on configuration."""
+    provider = "local" if get_config().get("llm_provider", "cloud") == "local" else "cloud"
+    client_kwargs, model_name = _provider_settings(provider)
+    return client_kwargs, model_name, provider
 
 
-def translate_llm(text: str, target_lang: str, prev_text: str = "", next_text: str = "") -> str:
-    """Call the configured LLM to translate *text*.
+def _client_settings():
+    """Cached ``(client_kwargs, model_name, provider)`` from :func:`_get_client_settings`."""
+    global _CLIENT_SETTINGS
+    if _CLIENT_SETTINGS is None:
+        _CLIENT_SETTINGS = _get_client_settings()
+    return _CLIENT_SETTINGS
 
-    Retries up to 3 times. On each attempt, validates that the returned
-    translation has the same number of lines as the source text. If the
-    line counts differ, the attempt is discarded and the call is retried.
 
-    Returns the original *text* unchanged (with a warning) only if all
-    retry attempts are exhausted.
-    """
-    if not text.strip():
-        return ""
+def _model_name() -> str:
+    return _client_settings()[1]
 
-    system_instr = CONFIG.get("translation", {}).get("system_instruction", "You are a professional subtitle translator.")
 
-    lines_to_translate = [l for l in text.splitlines() if l.strip()]
-    expected_line_count = len(lines_to_translate)
+def _provider() -> str:
+    return _client_settings()[2]
 
-    json_payload_data = {
-        "previous_context": [l for l in prev_text.splitlines() if l.strip()] if prev_text else [],
-        "lines_to_translate": lines_to_translate,
-        "following_context": [l for l in next_text.splitlines() if l.strip()] if next_text else []
-    }
-    json_payload = json.dumps(json_payload_data, indent=0, ensure_ascii=False)
 
-    user_prompt = _USER_PROMPT_TEMPLATE.format(
-        target_lang=target_lang,
-        expected_line_count=expected_line_count,
-        json_payload=json_payload
+def _warm_up():
+    """Import the openai package, which takes most of the start-up time; meant to run in a background thread."""
+    try:
+        import openai  # noqa: F401
+    except ImportError:
+        pass  # Reported when the first client is created
+
+# Log file of the subtitle being translated by the current task, used to route log records to it
+_CURRENT_FILE = contextvars.ContextVar("current_file", default=None)
+# Telemetry of the file being translated by the current task
+_CURRENT_STATS = contextvars.ContextVar("current_stats", default=None)
+# Models that answered the requests of the current translation task (see _track_served_models)
+_SERVED_MODELS = contextvars.ContextVar("served_models", default=None)
+# Totals over every file translated by this process
+_RUN_STATS = TranslationStats("run", keep_latencies=False)
+
+
+def _record_retry(cause: str):
+    stats = _CURRENT_STATS.get()
+    if stats is not None:
+        stats.record_retry(cause)
+
+# Async HTTP connections are bound to the event loop that opened them, so each loop gets its own
+# clients, semaphore capping the number of concurrent requests and rate limiters, shared by all files.
+_LOOP_RESOURCES = weakref.WeakKeyDictionary()
+
+
+class _LoopResources:
+    """Client pool, request semaphore and rate limiters shared by everything running on one event loop."""
+
+    def __init__(self):
+        translation_cfg = get_config().get("translation", {})
+        max_requests = translation_cfg.get("max_concurrent_requests", translation_cfg.get("max_workers", 1))
+        rate_cfg = get_config().get(_provider(), {}).get("rate_limit", {})
+
+        self.semaphore = asyncio.Semaphore(max(1, int(max_requests)))
+        self.max_rate_limit_retries = int(rate_cfg.get("max_retries", 8))
+        self.pool = _build_endpoint_pool()
+
+
+def _make_rate_limiter(provider: str) -> RateLimiter:
+    rate_cfg = get_config().get(provider, {}).get("rate_limit", {})
+    return RateLimiter(
+        requests_per_minute=rate_cfg.get("requests_per_minute", 0),
+        tokens_per_minute=rate_cfg.get("tokens_per_minute", 0)
+    )
+
+
+async def _probe_endpoint(endpoint: Endpoint):
+    """Health check of a down endpoint: list its models."""
+    await asyncio.wait_for(endpoint.client.models.list(), 10)
+
+
+def _build_endpoint_pool() -> EndpointPool:
+    """Create the clients of the configured endpoints.
+
+    The local provider can list several servers in ``local.endpoints``, each
+    ``{"base_url", "weight", "max_concurrent"}`` plus an optional
+    ``model_name`` and ``api_key`` overriding the ones of the ``local``
+    section. Requests are spread across them according to ``local.routing``,
+    and with ``local.failover_to_cloud`` the cloud provider takes over when
+    every local server is saturated or down. Otherwise there is a single
+    endpoint, the configured provider.
+    """
+    from openai import AsyncOpenAI
+
+    client_kwargs, model_name, provider = _client_settings()
+    rate_limiter = _make_rate_limiter(provider)
+
+    local_cfg = get_config().get("local", {})
+    endpoint_cfgs = local_cfg.get("endpoints") if provider == "local" else None
+    if not endpoint_cfgs:
+        endpoint = Endpoint(provider, AsyncOpenAI(**client_kwargs), provider, model_name, rate_limiter=rate_limiter)
+        return EndpointPool([endpoint])
+
+    endpoints = []
+    for endpoint_cfg in endpoint_cfgs:
+        kwargs = dict(client_kwargs, base_url=endpoint_cfg["base_url"])
+        if "api_key" in endpoint_cfg:
+            kwargs["api_key"] = endpoint_cfg["api_key"]
+        endpoints.append(Endpoint(
+            endpoint_cfg["base_url"], AsyncOpenAI(**kwargs), "local",
+            endpoint_cfg.get("model_name", model_name),
+            weight=endpoint_cfg.get("weight", 1.0),
+            max_concurrent=endpoint_cfg.get("max_concurrent"),
+            rate_limiter=rate_limiter
+        ))
+
+    fallback = None
+    if local_cfg.get("failover_to_cloud", False):
+        cloud_kwargs, cloud_model = _provider_settings("cloud")
+        fallback = Endpoint("cloud", AsyncOpenAI(**cloud_kwargs), "cloud", cloud_model,
+                            rate_limiter=_make_rate_limiter("cloud"))
+
+    return EndpointPool(
+        endpoints,
+        routing=local_cfg.get("routing", "least_outstanding"),
+        fallback=fallback,
+        health_check_interval=float(local_cfg.get("health_check_interval", 30)),
+        probe=_probe_endpoint
     )
 
-    if "gemma" in _MODEL_NAME.lower() or _PROVIDER != "local":
+
+def _get_loop_resources() -> _LoopResources:
+    """Return the resources shared by everything running on the current event loop."""
+    loop = asyncio.get_running_loop()
+    resources = _LOOP_RESOURCES.get(loop)
+    if resources is None:
+        resources = _LOOP_RESOURCES[loop] = _LoopResources()
+    return resources
+
+
+def _estimate_tokens(kwargs: dict) -> int:
+    """Rough prompt token estimate (~4 characters per token) used to reserve the tokens-per-minute budget."""
+    return sum(len(m["content"]) for m in kwargs["messages"]) // 4
+
+
+async def _create_completion(user_prompt: str, max_tokens: int):
+    """Send a chat completion request within the shared concurrency and rate limits.
+
+    The request is built for the endpoint the pool picks. A connection or
+    server error takes that endpoint out of rotation before it's raised, so
+    the caller's retry goes to another one.
+
+    Rate limit (429) responses don't count as failed attempts: every request to
+    the endpoint is paused for the Retry-After delay (or an exponential backoff
+    with jitter when the server doesn't give one) and the request is sent again.
+    """
+    from openai import APIConnectionError, InternalServerError, RateLimitError
+
+    resources = _get_loop_resources()
+
+    rate_limit_retries = 0
+    while True:
+        stats = _CURRENT_STATS.get()
+        async with resources.semaphore:
+            endpoint = await resources.pool.acquire()
+            kwargs = _build_request(user_prompt, max_tokens, endpoint)
+            estimated_tokens = _estimate_tokens(kwargs)
+            failed = False
+            rate_limited = None
+            try:
+                await endpoint.rate_limiter.acquire(estimated_tokens)
+                started = time.monotonic()
+                try:
+                    response = await endpoint.client.chat.completions.create(**kwargs)
+                except Exception as e:
+                    failed = isinstance(e, (APIConnectionError, InternalServerError))
+                    if stats is not None:
+                        stats.record_call(time.monotonic() - started, failed=True, endpoint=endpoint.name)
+                    raise
+            except RateLimitError as e:
+                rate_limited = e
+            finally:
+                resources.pool.release(endpoint, failed)
+
+        if rate_limited is not None:
+            _record_retry("rate_limited")
+            rate_limit_retries += 1
+            if rate_limit_retries > resources.max_rate_limit_retries:
+                raise rate_limited
+            retry_after = parse_retry_after(rate_limited)
+            delay = retry_after if retry_after is not None else backoff_delay(rate_limit_retries)
+            logging.warning(
+                f"{endpoint.name} LLM rate limit hit ({rate_limit_retries}/{resources.max_rate_limit_retries}). "
+                f"Retrying in {delay:.1f}s..."
+            )
+            endpoint.rate_limiter.pause(delay)
+            continue
+
+        usage = getattr(response, "usage", None)
+        if stats is not None:
+            stats.record_call(time.monotonic() - started, usage, endpoint=endpoint.name)
+        endpoint.rate_limiter.record_success(estimated_tokens, getattr(usage, "total_tokens", None))
+        served_models = _SERVED_MODELS.get()
+        if served_models is not None:
+            served_models.add(endpoint.model_name)
+        return response
+
+
+async def _track_served_models(coro):
+    """Await *coro* in its own task and return ``(result, models)``, the model names that answered its requests.
+
+    With an endpoint pool or a cloud failover the model can differ from the
+    configured one, and translations are cached per model.
+    """
+    served_models = set()
+    _SERVED_MODELS.set(served_models)
+    return await coro, served_models
+
+
+# Heading of the volatile part of the prompts; everything before it is the same for every request of a file
+_INPUT_DATA_HEADING = "### INPUT DATA:\n"
+# Section of the cached_prefix layout carrying the scene summary
+_SCENE_TEMPLATE = (
+    "### SCENE SO FAR (earlier subtitles and their translations, for continuity only; DO NOT output them):\n"
+    "{scene}\n\n"
+)
+
+
+def _prompt_layout() -> str:
+    return get_config().get("translation", {}).get("prompt_layout", "classic")
+
+
+def _cached_content_handle():
+    """Name of a pre-created Gemini context cache (``cachedContents/...``) to use, or None."""
+    if _provider() == "local" or _prompt_layout() != "cached_prefix":
+        return None
+    return get_config().get(_provider(), {}).get("cached_content") or None
+
+
+def _format_prompt(template: str, json_payload: str, scene: str = "", **fields) -> str:
+    """Fill a prompt *template*, placing the optional *scene* summary according to the prompt layout.
+
+    In the ``cached_prefix`` layout the instructions and the scene summary
+    (which only changes every few blocks) come first and the JSON payload
+    last, so consecutive requests share a byte-identical prefix that the
+    server can keep in its prompt cache. A Gemini cached-content handle only
+    holds the system instruction: the instructions depend on the target
+    language and the template (single block or batch), so they are always sent.
+    """
+    if _prompt_layout() != "cached_prefix":
+        return template.format(json_payload=json_payload, **fields)
+
+    instructions = template[:template.index(_INPUT_DATA_HEADING)].format(**fields)
+    if scene:
+        instructions += _SCENE_TEMPLATE.format(scene=scene)
+    return instructions + _INPUT_DATA_HEADING + json_payload
+
+
+def _build_request(user_prompt: str, max_tokens: int, endpoint=None) -> dict:
+    """Build the chat completion arguments for *user_prompt* for *endpoint* (default: the configured provider)."""
+    system_instr = get_config().get("translation", {}).get("system_instruction", "You are a professional subtitle translator.")
+    provider = endpoint.provider if endpoint is not None else _provider()
+    model_name = endpoint.model_name if endpoint is not None else _model_name()
+    # The prompt was formatted for the configured provider; a cloud fallback doesn't share its cache
+    cached_content = _cached_content_handle() if provider == _provider() else None
+
+    if cached_content:
+        # The system instruction is part of the cached content
+        messages = [
+            {"role": "user", "content": user_prompt}
+        ]
+    elif "gemma" in model_name.lower() or provider != "local":
         # Gemma models generally do not support the 'system' role;
         # merge the system instruction directly into the user message.
         messages = [
@@ -150,7 +451,7 @@ def translate_llm(text: str, target_lang: str, prev_text: str = "", next_text: s
 
     # Disable chain-of-thought / thinking to keep responses clean for Google cloud API.
     extra_body = None
-    if _PROVIDER != "local":
+    if provider != "local":
         extra_body = {
             "google": {
                 "thinking_config": {
@@ -160,29 +461,150 @@ def translate_llm(text: str, target_lang: str, prev_text: str = "", next_text: s
             }
         }
 
+    kwargs = {
+        "model": model_name,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": 0.1,
+        "top_p": 0.95
+    }
+    if cached_content:
+        extra_body["google"]["cached_content"] = cached_content
+    elif provider == "local" and _prompt_layout() == "cached_prefix":
+        # Ask llama.cpp's server to keep the evaluated prompt for the next request (ignored by other servers)
+        extra_body = {"cache_prompt": True}
+    if extra_body is not None:
+        kwargs["extra_body"] = extra_body
+    return kwargs
+
+
+def _prompt_version() -> str:
+    """Short hash of the prompts, system instruction and prompt layout, so cached translations are invalidated when they change."""
+    system_instr = get_config().get("translation", {}).get("system_instruction", "")
+    parts = [_USER_PROMPT_TEMPLATE, _BATCH_USER_PROMPT_TEMPLATE, _SCENE_TEMPLATE, system_instr,
+             _prompt_layout(), _cached_content_handle() or ""]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()[:12]
+
+
+def _open_translation_memory():
+    """Open the on-disk translation memory if enabled in config, otherwise return None."""
+    memory_cfg = get_config().get("translation_memory", {})
+    if not memory_cfg.get("enabled", False):
+        return None
+
+    path = memory_cfg.get("path", "translation_memory.db")
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+
+    try:
+        return TranslationMemory(path, max_entries=int(memory_cfg.get("max_entries", 100000)))
+    except Exception as e:
+        logging.warning(f"Failed to open translation memory at {path}: {e}. Continuing without it.")
+        return None
+
+
+def _context_lines(text: str) -> list:
+    """Split a context string into its non-empty lines."""
+    return [l for l in text.splitlines() if l.strip()] if text else []
+
+
+def _line_repair_enabled() -> bool:
+    return bool(get_config().get("translation", {}).get("line_repair", True))
+
+
+async def _repair_translation(lines: list, translated: str, target_lang: str, prev_text: str, next_text: str,
+                              on_retry=None, scene: str = "", echo_lines=None):
+    """Fit a *translated* reply with the wrong number of lines to the source *lines*.
+
+    Deterministic fixes come first (see :func:`line_repair.repair_line_count`);
+    the source lines that still can't be aligned are translated again on their
+    own, with the rest of the block as context. *echo_lines*, if given,
+    returns the translations of the neighbouring blocks known so far, which
+    the model may echo as well. Returns the repaired text, or None if no line
+    at all could be aligned.
+    """
+    context = _context_lines(prev_text) + _context_lines(next_text) + (echo_lines() if echo_lines else [])
+    repaired = repair_line_count(lines, translated.splitlines(), context)
+    missing = [i for i, line in enumerate(repaired) if line is None]
+    if len(missing) == len(lines):
+        return None
+
+    if missing:
+        logging.info(f"[Line repair] Re-requesting {len(missing)}/{len(lines)} lines that could not be aligned.")
+        first, last = missing[0], missing[-1]
+        sub_prev = "\n".join(filter(None, [prev_text] + lines[:first]))
+        sub_next = "\n".join(filter(None, lines[last + 1:] + [next_text]))
+        retranslated = await translate_llm_async(
+            "\n".join(lines[i] for i in missing), target_lang, sub_prev, sub_next, on_retry, scene, echo_lines
+        )
+        retranslated_lines = retranslated.splitlines()
+        if len(retranslated_lines) != len(missing):
+            return None
+        for i, line in zip(missing, retranslated_lines):
+            repaired[i] = line
+    else:
+        logging.info(f"[Line repair] Fixed line count mismatch without a new request ({len(translated.splitlines())} -> {len(lines)} lines).")
+
+    stats = _CURRENT_STATS.get()
+    if stats is not None:
+        stats.lines_repaired += 1
+    return "\n".join(repaired)
+
+
+async def translate_llm_async(text: str, target_lang: str, prev_text: str = "", next_text: str = "",
+                              on_retry=None, scene: str = "", echo_lines=None) -> str:
+    """Call the configured LLM to translate *text*.
+
+    Retries up to 3 times. On each attempt, validates that the returned
+    translation has the same number of lines as the source text. If the
+    line counts differ, the reply is first repaired (merging or splitting
+    lines, dropping echoed context, re-requesting only the lines that can't
+    be aligned) unless ``translation.line_repair`` is disabled; the attempt
+    is discarded and the call retried only if nothing could be aligned.
+    *on_retry*, if given, is called whenever an attempt fails and is retried.
+    *scene* is the rolling summary used by the ``cached_prefix`` prompt layout.
+    *echo_lines* is passed on to :func:`_repair_translation`.
+
+    Returns the original *text* unchanged (with a warning) only if all
+    retry attempts are exhausted.
+    """
+    if not text.strip():
+        return ""
+    # Invalid client settings raise here rather than being retried
+    _get_loop_resources()
+
+    lines_to_translate = [l for l in text.splitlines() if l.strip()]
+    expected_line_count = len(lines_to_translate)
+
+    json_payload_data = {
+        "previous_context": _context_lines(prev_text),
+        "lines_to_translate": lines_to_translate,
+        "following_context": _context_lines(next_text)
+    }
+    json_payload = json.dumps(json_payload_data, indent=0, ensure_ascii=False)
+
+    user_prompt = _format_prompt(
+        _USER_PROMPT_TEMPLATE, json_payload, scene,
+        target_lang=target_lang,
+        expected_line_count=expected_line_count
+    )
+
     max_attempts = 3
     for attempt in range(1, max_attempts + 1):
         try:
-            kwargs = {
-                "model": _MODEL_NAME,
-                "messages": messages,
-                "max_tokens": 2048,
-                "temperature": 0.1,
-                "top_p": 0.95
-            }
-            if extra_body is not None:
-                kwargs["extra_body"] = extra_body
+            # logging.info(f"Messages: {kwargs['messages']}")
 
-            # logging.info(f"Messages: {messages}")
-
-            response = _CLIENT.chat.completions.create(**kwargs)
+            response = await _create_completion(user_prompt, max_tokens=2048)
 
             raw = response.choices[0].message.content
             if not raw or not raw.strip():
                 logging.warning(
                     f"[Block translation] Attempt {attempt}/{max_attempts}: LLM returned an empty response. Retrying..."
                 )
-                time.sleep(2)
+                _record_retry("empty")
+                if on_retry is not None:
+                    on_retry()
+                await asyncio.sleep(2)
                 continue
 
             translated = _strip_context_leakage(raw.strip())
@@ -191,10 +613,20 @@ def translate_llm(text: str, target_lang: str, prev_text: str = "", next_text: s
                 logging.warning(
                     f"[Block translation] Attempt {attempt}/{max_attempts}: Translation was empty after stripping context markers. Retrying..."
                 )
-                time.sleep(2)
+                _record_retry("stripped_empty")
+                if on_retry is not None:
+                    on_retry()
+                await asyncio.sleep(2)
                 continue
 
             actual_line_count = len(translated.splitlines())
+            if actual_line_count != expected_line_count and _line_repair_enabled():
+                repaired = await _repair_translation(
+                    lines_to_translate, translated, target_lang, prev_text, next_text, on_retry, scene, echo_lines
+                )
+                if repaired is not None:
+                    return repaired
+
             if actual_line_count != expected_line_count:
                 logging.warning(
                     f"[Block translation] Attempt {attempt}/{max_attempts}: Line count mismatch — "
@@ -202,14 +634,20 @@ def translate_llm(text: str, target_lang: str, prev_text: str = "", next_text: s
                     f"  Original : {repr(text)}\n"
                     f"  Translated: {repr(translated)}"
                 )
-                time.sleep(2)
+                _record_retry("line_mismatch")
+                if on_retry is not None:
+                    on_retry()
+                await asyncio.sleep(2)
                 continue
 
             return translated
 
         except Exception as e:
-            logging.error(f"[Block translation] Attempt {attempt}/{max_attempts}: Error calling {_PROVIDER} LLM: {e}. Retrying...")
-            time.sleep(2)
+            logging.error(f"[Block translation] Attempt {attempt}/{max_attempts}: Error calling {_provider()} LLM: {e}. Retrying...")
+            _record_retry("exception")
+            if on_retry is not None:
+                on_retry()
+            await asyncio.sleep(backoff_delay(attempt))
 
     logging.warning(
         f"[Block translation] All {max_attempts} attempts failed. Keeping original text:\n  {repr(text)}"
@@ -217,55 +655,242 @@ def translate_llm(text: str, target_lang: str, prev_text: str = "", next_text: s
     return text
 
 
-def translate_file(srt_path: str, target_lang: str, output_suffix: str) -> bool:
+def translate_llm(text: str, target_lang: str, prev_text: str = "", next_text: str = "") -> str:
+    """Synchronous wrapper around :func:`translate_llm_async`."""
+    return asyncio.run(translate_llm_async(text, target_lang, prev_text, next_text))
+
+
+def _parse_batch_response(raw: str, block_ids: list) -> dict:
+    """Split a batch reply into ``{block_id: translated_text}`` using the [[id]] marker lines.
+
+    Lines before the first marker and blocks with unknown ids are ignored.
+    """
+    parsed = {}
+    current_id = None
+    for line in raw.splitlines():
+        match = _BATCH_MARKER_RE.match(line)
+        if match:
+            current_id = int(match.group(1))
+            if current_id in block_ids:
+                parsed.setdefault(current_id, [])
+            continue
+        if current_id in parsed and line.strip():
+            parsed[current_id].append(line)
+    return {block_id: _strip_context_leakage("\n".join(lines)) for block_id, lines in parsed.items()}
+
+
+async def translate_llm_batch_async(texts: list, target_lang: str, prev_text: str = "", next_text: str = "",
+                                    on_retry=None, scene: str = "", echo_lines=None) -> list:
+    """Translate several consecutive subtitle blocks with a single LLM request.
+
+    The reply is split back per block and each block's line count is
+    validated independently. Blocks that fail are re-sent in smaller
+    batches (halving the size each time); a single remaining block goes
+    through :func:`translate_llm_async` and its usual retries. *on_retry*,
+    if given, is called whenever some blocks have to be re-sent. *scene* is
+    the rolling summary used by the ``cached_prefix`` prompt layout.
+    *echo_lines* is passed on to :func:`_repair_translation`.
+
+    Returns the translations in the same order as *texts*.
+    """
+    if len(texts) <= 1:
+        return [await translate_llm_async(t, target_lang, prev_text, next_text, on_retry, scene, echo_lines)
+                for t in texts]
+
+    results = [None] * len(texts)
+    lines_per_block = []
+    blocks_payload = []
+    for i, text in enumerate(texts):
+        lines = [l for l in text.splitlines() if l.strip()]
+        lines_per_block.append(lines)
+        if lines:
+            blocks_payload.append({"id": i + 1, "lines": lines})
+        else:
+            results[i] = ""
+    if not blocks_payload:
+        return results
+
+    json_payload_data = {
+        "previous_context": _context_lines(prev_text),
+        "blocks": blocks_payload,
+        "following_context": _context_lines(next_text)
+    }
+    json_payload = json.dumps(json_payload_data, indent=0, ensure_ascii=False)
+
+    user_prompt = _format_prompt(
+        _BATCH_USER_PROMPT_TEMPLATE, json_payload, scene,
+        target_lang=target_lang,
+        first_id=blocks_payload[0]["id"]
+    )
+    # Leave room for the [[id]] markers on top of the usual single block budget
+    max_tokens = max(2048, 256 * len(blocks_payload))
+
+    parsed = {}
+    try:
+        response = await _create_completion(user_prompt, max_tokens)
+        raw = response.choices[0].message.content
+        if raw and raw.strip():
+            parsed = _parse_batch_response(raw, [b["id"] for b in blocks_payload])
+        else:
+            logging.warning(f"[Batch translation] LLM returned an empty response for {len(blocks_payload)} blocks.")
+    except Exception as e:
+        logging.error(f"[Batch translation] Error calling {_provider()} LLM for {len(blocks_payload)} blocks: {e}")
+
+    failed = []
+    for block in blocks_payload:
+        i = block["id"] - 1
+        translated = parsed.get(block["id"], "")
+        actual_line_count = len(translated.splitlines())
+        if translated and actual_line_count == len(lines_per_block[i]):
+            results[i] = translated
+            continue
+
+        if translated and _line_repair_enabled():
+            # Only the deterministic fixes here, the blocks still misaligned are re-sent below
+            context = _context_lines("\n".join(texts[max(0, i - 1):i] or [prev_text]))
+            context += _context_lines("\n".join(texts[i + 1:i + 2] or [next_text]))
+            # The model may also echo the translation of a neighbouring block
+            context += _context_lines("\n".join(filter(None, [parsed.get(block["id"] - 1), parsed.get(block["id"] + 1)])))
+            context += echo_lines() if echo_lines else []
+            repaired = repair_line_count(lines_per_block[i], translated.splitlines(), context)
+            if None not in repaired:
+                results[i] = "\n".join(repaired)
+                stats = _CURRENT_STATS.get()
+                if stats is not None:
+                    stats.lines_repaired += 1
+                continue
+        failed.append(i)
+
+    if not failed:
+        return results
+
+    logging.warning(
+        f"[Batch translation] {len(failed)}/{len(blocks_payload)} blocks missing or with a line count mismatch. "
+        f"Retrying them in smaller batches..."
+    )
+    _record_retry("batch_resend")
+    if on_retry is not None:
+        on_retry()
+
+    # Re-send the failed blocks in halves, using the surrounding blocks of this batch as context
+    half = max(1, len(failed) // 2)
+    groups = [failed[start:start + half] for start in range(0, len(failed), half)]
+    retries = []
+    for group in groups:
+        first, last = group[0], group[-1]
+        group_prev = "\n\n".join(texts[max(0, first - 2):first]) if first > 0 else prev_text
+        group_next = "\n\n".join(texts[last + 1:last + 3]) if last + 1 < len(texts) else next_text
+        retries.append(translate_llm_batch_async([texts[i] for i in group], target_lang, group_prev, group_next,
+                                                 on_retry, scene, echo_lines))
+
+    for group, translations in zip(groups, await asyncio.gather(*retries)):
+        for i, translated in zip(group, translations):
+            results[i] = translated
+
+    return results
+
+
+def translate_llm_batch(texts: list, target_lang: str, prev_text: str = "", next_text: str = "") -> list:
+    """Synchronous wrapper around :func:`translate_llm_batch_async`."""
+    return asyncio.run(translate_llm_batch_async(texts, target_lang, prev_text, next_text))
+
+
+def _report_stats(stats: TranslationStats, srt_path: str):
+    """Log the telemetry of a finished file and export it as configured (JSON summary, Prometheus text file)."""
+    telemetry_cfg = get_config().get("telemetry", {})
+    if not telemetry_cfg.get("enabled", True):
+        return
+
+    input_price = float(telemetry_cfg.get("price_per_million_input_tokens", 0.0))
+    output_price = float(telemetry_cfg.get("price_per_million_output_tokens", 0.0))
+    stats.finish()
+    _RUN_STATS.merge(stats)
+
+    summary = stats.summary(input_price, output_price)
+    logging.info(f"Telemetry: {json.dumps(summary)}")
+    try:
+        if telemetry_cfg.get("summary_json", True):
+            # Next to the file's log: metrics_<name>.json
+            summary_path = os.path.join(os.path.dirname(os.path.abspath(srt_path)), f"metrics_{stats.name}.json")
+            stats.write_json(summary_path, input_price, output_price)
+
+        prometheus_path = telemetry_cfg.get("prometheus_textfile")
+        if prometheus_path:
+            labels = {"provider": _provider(), "model": _model_name()}
+            _RUN_STATS.write_prometheus(prometheus_path, labels, input_price, output_price)
+    except OSError as e:
+        logging.warning(f"Failed to write telemetry for {srt_path}: {e}")
+
+
+# Distinct cue translations remembered per file for deduplication
+_DEDUP_MAX_ENTRIES = 10000
+# Characters around a cue line that don't change its translation ("[Music]", "(MUSIC)", "♪ la la la ♪"),
+# and trailing punctuation ignored as well; "?" and "!" are kept, they do change it
+_DEDUP_WRAPPERS = " \t[](){}<>♪♫*#"
+_DEDUP_TRAILING = " .,;:…"
+
+
+def _dedup_key(text: str) -> str:
+    """Key under which repeated cues share a translation: whitespace, case and the brackets or music
+    notes around each line are ignored."""
+    lines = (line.strip(_DEDUP_WRAPPERS).rstrip(_DEDUP_TRAILING).strip(_DEDUP_WRAPPERS).casefold()
+             for line in normalize_source(text).splitlines())
+    # Cues made only of punctuation ("♪", "...") are compared as they are
+    return "\n".join(line for line in lines if line) or normalize_source(text)
+
+# Map (path, mtime, size) -> (encoding, block count, source hash), shared by the pipelines of a multi-target run
+_SOURCE_INFO_CACHE = OrderedDict()
+_SOURCE_INFO_CACHE_SIZE = 32
+
+
+def _source_info(srt_path: str):
+    """Return ``(encoding, total_blocks, source_hash)`` of *srt_path*, computed once per version of the file."""
+    stat = os.stat(srt_path)
+    key = (os.path.abspath(srt_path), stat.st_mtime_ns, stat.st_size)
+    info = _SOURCE_INFO_CACHE.get(key)
+    if info is None:
+        encoding = detect_encoding(srt_path)
+        info = (encoding, count_srt_blocks(srt_path, encoding), file_hash(srt_path))
+        _SOURCE_INFO_CACHE[key] = info
+        if len(_SOURCE_INFO_CACHE) > _SOURCE_INFO_CACHE_SIZE:
+            _SOURCE_INFO_CACHE.popitem(last=False)
+    else:
+        _SOURCE_INFO_CACHE.move_to_end(key)
+    return info
+
+
+async def translate_file_async(srt_path: str, target_lang: str, output_suffix: str, log_tag: str = "") -> bool:
+    """Translate *srt_path* into *target_lang*, writing the output next to it. Returns True on success.
+
+    Requests are issued concurrently (up to ``max_workers`` per file) on the
+    running event loop, sharing its client and request semaphore with any
+    other file translated on the same loop. *log_tag* is appended to the
+    names of the file's log and metrics, to tell apart several target
+    languages of the same file.
+    """
     if not os.path.exists(srt_path):
         logging.error(f"File not found: {srt_path}")
         return False
 
     # Setup file logging for this specific subtitle file
-    log_filename = f"log_{os.path.basename(srt_path)}"
-    log_path = os.path.join(os.path.dirname(os.path.abspath(srt_path)), log_filename)
+    log_name = os.path.basename(srt_path) + log_tag
+    log_path = os.path.join(os.path.dirname(os.path.abspath(srt_path)), f"log_{log_name}")
     file_handler = logging.FileHandler(log_path, mode='a', encoding='utf-8')
     file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    # Several files may be translated concurrently on the same loop; only keep this file's records
+    file_handler.addFilter(lambda record: _CURRENT_FILE.get() == log_path)
     logging.getLogger().addHandler(file_handler)
+    context_token = _CURRENT_FILE.set(log_path)
+    stats = TranslationStats(log_name)
+    stats_token = _CURRENT_STATS.set(stats)
 
     try:
         logging.info(f"Reading subtitle file: {srt_path}")
-        try:
-            with open(srt_path, 'r', encoding='utf-8') as f:
-                text = f.read()
-        except UnicodeDecodeError:
-            logging.warning(f"UTF-8 decoding failed for {srt_path}. Retrying with latin-1...")
-            with open(srt_path, 'r', encoding='latin-1') as f:
-                text = f.read()
-
-        # Normalise line endings and strip a UTF-8 BOM if present
-        text = text.lstrip('\ufeff').replace('\r\n', '\n').replace('\r', '\n')
-
-        blocks = text.strip().split('\n\n')
-        # Filter out any completely blank/whitespace-only blocks that can appear in malformed SRTs
-        blocks = [b for b in blocks if b.strip()]
-        logging.info(f"Total blocks found: {len(blocks)}")
-
-        parsed_blocks = []
-        for b in blocks:
-            lines = b.split('\n')
-            if len(lines) >= 3:
-                parsed_blocks.append({
-                    "block_num": lines[0].strip(),
-                    "timestamp": lines[1].strip(),
-                    "original_text": "\n".join(lines[2:]).strip(),
-                    "translated_text": None,
-                    "raw": b
-                })
-            else:
-                parsed_blocks.append({
-                    "block_num": "",
-                    "timestamp": "",
-                    "original_text": "",
-                    "translated_text": None,
-                    "raw": b
-                })
+        # The file is streamed block by block; only a sliding window of blocks is kept in memory
+        encoding, total_blocks, source_hash = _source_info(srt_path)
+        if encoding != "utf-8-sig":
+            logging.warning(f"UTF-8 decoding failed for {srt_path}. Reading it as {encoding}...")
+        logging.info(f"Total blocks found: {total_blocks}")
 
         # Construct output filename: [name].[target_lang][.sdh].srt
         # Logic: remove .eng, keep .sdh but place it after target_lang (output_suffix)
@@ -295,96 +920,475 @@ def translate_file(srt_path: str, target_lang: str, output_suffix: str) -> bool:
         output_path = os.path.join(dirname, output_filename)
         start_index: int = 0
 
-        if os.path.exists(output_path):
+        translation_cfg = get_config().get("translation", {})
+        context_prev_count = translation_cfg.get("context_blocks_previous", 2)
+        context_next_count = translation_cfg.get("context_blocks_next", 2)
+
+        # Sidecar journal of every translated block, recorded as soon as it completes (in any order)
+        journal = CheckpointJournal(output_path + ".journal")
+        previous_source_hash, journal_entries = journal.load()
+        restored_from_journal = 0
+        resumed_context = {}  # Map block index -> translated text read back from a partial output file
+
+        def on_block_loaded(block):
+            nonlocal restored_from_journal
+            # Entries are only reused if the block's source text is unchanged, and dropped once applied
+            entry = journal_entries.pop(block.index, None)
+            if entry and block.text and entry[0] == text_hash(block.text):
+                block.translated = entry[1]
+                restored_from_journal += 1
+            elif block.index in resumed_context:
+                block.translated = resumed_context.pop(block.index)
+
+        if journal.exists():
+            logging.info(f"Resuming from checkpoint journal {journal.path} ({len(journal_entries)} blocks recorded)...")
+            if previous_source_hash != source_hash:
+                logging.warning(
+                    f"{srt_path} changed since the partial translation was made. "
+                    f"Only blocks whose source text is unchanged will be reused."
+                )
+        elif os.path.exists(output_path):
             logging.info(f"Checking for existing translations in {output_path}...")
+            # Partial output from before the journal existed: resume after the blocks already written,
+            # keeping the last few of them as translated context for the next block. They are also put
+            # in the new journal, which would otherwise make a later resume rewrite the output without them.
             try:
-                with open(output_path, 'r', encoding='utf-8') as f:
-                    existing_content = f.read().strip()
+                last_blocks = deque(maxlen=max(1, context_prev_count))
+                source_blocks = iter_srt_file(srt_path, encoding)
+                for block in iter_srt_file(output_path, "utf-8-sig"):
+                    source = next(source_blocks, None)
+                    if source is not None and source.text and block.raw is None:
+                        journal_entries[block.index] = (text_hash(source.text), block.text)
+                    last_blocks.append(block)
+                    start_index += 1
             except Exception as e:
                 logging.warning(f"Failed to read existing content: {e}")
-                existing_content = ""
+                start_index = 0
+                journal_entries.clear()
 
-            if existing_content and len(existing_content) > 5:
-                already_translated_list = [b for b in existing_content.split('\n\n') if b.strip()]
-                start_index = len(already_translated_list)
+            if start_index > 0:
                 # Ensure we don't start out of bounds bounds if output has more blocks for some reason
-                start_index = min(start_index, len(parsed_blocks))
+                start_index = min(start_index, total_blocks)
                 logging.info(f"Found {start_index} already translated blocks. Resuming from block {start_index + 1}.")
-
-                # Populate previously translated texts into the parsed container
-                for i in range(start_index):
-                    lines = already_translated_list[i].split('\n')
-                    if len(lines) >= 3:
-                        parsed_blocks[i]["translated_text"] = "\n".join(lines[2:]).strip()
-                    else:
-                        parsed_blocks[i]["translated_text"] = parsed_blocks[i]["original_text"]
+                for block in last_blocks:
+                    if block.index < start_index:
+                        resumed_context[block.index] = block.text if block.raw is None else ""
         else:
             logging.info(f"No existing output file found at {output_path}.")
 
-        if start_index >= len(parsed_blocks):
+        if start_index >= total_blocks:
             logging.info(f"All blocks in {srt_path} are already translated.")
             return True
 
+        # Create the client now (the openai import was started in the background at startup), so invalid
+        # settings fail the file instead of failing every request
+        _get_loop_resources()
+
+        journal.start(source_hash, journal_entries)
+        blocks = BlockWindow(iter_srt_file(srt_path, encoding), on_load=on_block_loaded)
+        blocks.release(start_index - context_prev_count)
+
         logging.info(f"Preparing blocks to process (starting from index {start_index})...")
         mode = 'a' if start_index > 0 else 'w'
         logging.info(f"Opening output file in mode '{mode}'...")
 
+        # Number of blocks translated concurrently. With a single worker every block is only
+        # dispatched once its predecessor is done, so the previous context is always translated.
+        max_workers = max(1, int(translation_cfg.get("max_workers", 1)))
+        # Number of consecutive blocks packed into a single request (1 disables batching)
+        batch_size = max(1, int(translation_cfg.get("batch_size", 1)))
+        # While a request is being retried (e.g. line count mismatch) it gives up its worker slot,
+        # so the following blocks keep being translated instead of waiting for it
+        speculative_prefetch = bool(translation_cfg.get("speculative_prefetch", False))
+        # How far ahead of the last written block we may dispatch; bounds the blocks kept in memory.
+        # Prefetching past a stuck block needs more room: a full retry cycle takes several requests.
+        default_window = max_workers * batch_size * (16 if speculative_prefetch else 4)
+        window_size = max(max_workers * batch_size, int(translation_cfg.get("concurrency_window", default_window)))
+        if max_workers > 1 or speculative_prefetch:
+            logging.info(f"Translating with {max_workers} concurrent workers (window of {window_size} blocks)...")
+        if batch_size > 1:
+            logging.info(f"Batching up to {batch_size} blocks per request...")
+
+        # cached_prefix layout: the prompt prefix carries a summary of the last written blocks, only
+        # rebuilt every scene_refresh_blocks blocks so the requests in between share the same prefix
+        use_scene = _prompt_layout() == "cached_prefix"
+        scene_refresh = max(1, int(translation_cfg.get("scene_refresh_blocks", 20)))
+        recent_written = deque(maxlen=max(0, int(translation_cfg.get("scene_summary_blocks", 8))))
+        scene_segment = None
+        scene = ""
+        if use_scene:
+            logging.info(f"Using the cached prefix prompt layout (scene summary refreshed every {scene_refresh} blocks)...")
+
+        def scene_for(index):
+            nonlocal scene_segment, scene
+            if use_scene and index // scene_refresh != scene_segment:
+                scene_segment = index // scene_refresh
+                scene = "\n".join(
+                    f"{' / '.join(src.splitlines())} => {' / '.join(dst.splitlines())}" for src, dst in recent_written
+                )
+            return scene
+
+        def build_context(actual_index):
+            # Get preceding texts (translated text preferred for consistency, original while still in flight)
+            prev_texts = []
+            for i in range(max(0, actual_index - context_prev_count), actual_index):
+                block = blocks.get(i)
+                txt = (block.translated or block.text).strip()
+                if txt:
+                    prev_texts.append(txt)
+
+            # Get following texts (original texts)
+            next_texts = []
+            for i in range(actual_index + 1, min(total_blocks, actual_index + 1 + context_next_count)):
+                txt = blocks.get(i).text.strip()
+                if txt:
+                    next_texts.append(txt)
+
+            return "\n\n".join(prev_texts), "\n\n".join(next_texts)
+
+        def is_done(block):
+            return not block.text or block.translated is not None
+
+        def neighbour_translations(first, last):
+            # Translations known so far of the blocks around first..last, for spotting echoes in a reply
+            def echo_lines():
+                lines = []
+                for i in range(max(0, first - context_prev_count), min(total_blocks, last + 1 + context_next_count)):
+                    if first <= i <= last:
+                        continue
+                    try:
+                        block = blocks.get(i)
+                    except IndexError:
+                        continue  # Already written and released from the window
+                    if block is not None and block.translated and block.translated != block.text:
+                        lines.extend(_context_lines(block.translated))
+                return lines
+            return echo_lines
+
+        # Translations of identical source text are reused across files (and runs) when enabled
+        memory = _open_translation_memory()
+        prompt_version = _prompt_version()
+        memory_key = (target_lang, _model_name(), prompt_version)
+        memory_hits = 0
+        memory_misses = 0
+
+        # Repeated cues ("[music]", speaker tags, song lyrics...) are only sent once per file: later
+        # copies reuse the translation of the first one, or wait for it while it is in flight
+        deduplicate = bool(translation_cfg.get("deduplicate", True))
+        dedup_translations = OrderedDict()  # Map dedup key -> translation, most recent last
+        dedup_leaders = {}  # Map dedup key -> index of the in-flight block translating it
+        dedup_followers = {}  # Map leader index -> indices of the copies waiting for its translation
+        redispatch = deque()  # Copies whose leader failed, to translate on their own
+        duplicates = 0
+
+        in_flight = {}  # Map task -> list of block indices
+        retrying = set()  # First block index of the in-flight requests currently being retried
+        slot_freed = asyncio.Event()
+
+        def on_retry(first_index):
+            if speculative_prefetch and first_index not in retrying:
+                retrying.add(first_index)
+                slot_freed.set()
+
         try:
             with open(output_path, mode, encoding='utf-8', newline='') as f:
                 logging.info("Output file opened successfully.")
-                for actual_index in range(start_index, len(parsed_blocks)):
-                    block_data = parsed_blocks[actual_index]
-
-                    if not block_data["original_text"]:
-                        f.write(block_data["raw"] + "\n\n")
+                next_submit = start_index
+                next_write = start_index
+                to_checkpoint = []  # Blocks translated since the last journal write
+
+                while next_write < total_blocks:
+                    # Keep up to max_workers requests in flight (not counting the ones being retried),
+                    # never dispatching beyond the window
+                    slot_freed.clear()
+                    while len(in_flight) - len(retrying) < max_workers and (
+                            redispatch or (next_submit < total_blocks and next_submit < next_write + window_size)):
+                        # Copies of a cue whose translation failed are sent on their own
+                        batch = [redispatch.popleft()] if redispatch else []
+                        fill_up_to = 1 if batch else batch_size
+                        while (next_submit < total_blocks and len(batch) < fill_up_to
+                               and next_submit < next_write + window_size):
+                            block = blocks.get(next_submit)
+                            if block.text and block.translated is None:
+                                key = _dedup_key(block.text) if deduplicate else None
+                                if key in dedup_translations:
+                                    block.translated = dedup_translations[key]
+                                    dedup_translations.move_to_end(key)
+                                    to_checkpoint.append((next_submit, block.text, block.translated))
+                                    duplicates += 1
+                                    next_submit += 1
+                                    continue
+                                if key in dedup_leaders:
+                                    dedup_followers[dedup_leaders[key]].append(next_submit)
+                                    duplicates += 1
+                                    next_submit += 1
+                                    continue
+
+                                cached = memory.get(block.text, *memory_key) if memory else None
+                                if cached is not None:
+                                    block.translated = cached
+                                    to_checkpoint.append((next_submit, block.text, cached))
+                                    memory_hits += 1
+                                else:
+                                    batch.append(next_submit)
+                                    memory_misses += 1
+                                    if deduplicate:
+                                        dedup_leaders[key] = next_submit
+                                        dedup_followers[next_submit] = []
+                            next_submit += 1
+                        if not batch:
+                            continue
+
+                        prev_text, _ = build_context(batch[0])
+                        _, next_text = build_context(batch[-1])
+                        if len(batch) == 1:
+                            logging.info(f"Translating block {batch[0] + 1}/{total_blocks}...")
+                            task = asyncio.create_task(_track_served_models(translate_llm_async(
+                                blocks.get(batch[0]).text, target_lang, prev_text, next_text,
+                                functools.partial(on_retry, batch[0]), scene_for(batch[0]),
+                                neighbour_translations(batch[0], batch[-1]))))
+                        else:
+                            logging.info(f"Translating blocks {batch[0] + 1}-{batch[-1] + 1}/{total_blocks}...")
+                            task = asyncio.create_task(_track_served_models(translate_llm_batch_async(
+                                [blocks.get(i).text for i in batch], target_lang, prev_text, next_text,
+                                functools.partial(on_retry, batch[0]), scene_for(batch[0]),
+                                neighbour_translations(batch[0], batch[-1]))))
+                        in_flight[task] = batch
+
+                    # Journal finished blocks first (in any order), then write the output strictly in order
+                    if to_checkpoint:
+                        # The fsync runs in a thread so the requests in flight (and the other files of a
+                        # multi-target run) keep being served meanwhile
+                        await asyncio.to_thread(journal.record, to_checkpoint)
+                        to_checkpoint = []
+                    while next_write < next_submit and is_done(blocks.get(next_write)):
+                        block = blocks.get(next_write)
+                        f.write(block.format(block.translated) + "\n\n")
+                        if block.text:
+                            logging.info(f"Processed block {next_write + 1}/{total_blocks}")
+                            if block.translated != block.text:
+                                recent_written.append((block.text, block.translated))
                         f.flush()
-                        continue
-
-                    context_prev_count = CONFIG.get("translation", {}).get("context_blocks_previous", 2)
-                    context_next_count = CONFIG.get("translation", {}).get("context_blocks_next", 2)
-
-                    # Get preceding texts (translated text preferred for consistency)
-                    prev_texts = []
-                    for i in range(max(0, actual_index - context_prev_count), actual_index):
-                        txt = (parsed_blocks[i].get("translated_text") or parsed_blocks[i].get("original_text") or "").strip()
-                        if txt:
-                            prev_texts.append(txt)
-                    prev_text = "\n\n".join(prev_texts)
-
-                    # Get following texts (original texts)
-                    next_texts = []
-                    for i in range(actual_index + 1, min(len(parsed_blocks), actual_index + 1 + context_next_count)):
-                        txt = (parsed_blocks[i].get("original_text") or "").strip()
-                        if txt:
-                            next_texts.append(txt)
-                    next_text = "\n\n".join(next_texts)
-
-                    logging.info(f"Translating block {actual_index + 1}/{len(parsed_blocks)}...")
-                    translated_text = translate_llm(block_data["original_text"], target_lang, prev_text, next_text)
-
-                    # Store back translated text to be used as context for future blocks
-                    parsed_blocks[actual_index]["translated_text"] = translated_text
-
-                    result = f"{block_data['block_num']}\n{block_data['timestamp']}\n{translated_text}"
-                    f.write(result + "\n\n")
-                    f.flush()
-                    logging.info(f"Processed block {actual_index + 1}/{len(parsed_blocks)}")
-
+                        next_write += 1
+                    # Written blocks are only needed as previous context from now on
+                    blocks.release(next_write - context_prev_count)
+
+                    if in_flight:
+                        # Wake up when a request completes, or when one starts retrying and frees its slot
+                        slot_waiter = asyncio.create_task(slot_freed.wait())
+                        done, _ = await asyncio.wait(set(in_flight) | {slot_waiter}, return_when=asyncio.FIRST_COMPLETED)
+                        slot_waiter.cancel()
+                        for task in done:
+                            if task is slot_waiter:
+                                continue
+                            batch = in_flight.pop(task)
+                            retrying.discard(batch[0])
+                            result, served_models = task.result()
+                            translations = [result] if len(batch) == 1 else result
+                            # Remembered under the model that answered, unless several models shared the work
+                            served_key = None
+                            if len(served_models) == 1:
+                                served_key = (target_lang, next(iter(served_models)), prompt_version)
+                            # Store back translated text to be used as context for future blocks
+                            stats.blocks_translated += len(batch)
+                            for i, translated_text in zip(batch, translations):
+                                block = blocks.get(i)
+                                block.translated = translated_text
+                                to_checkpoint.append((i, block.text, translated_text))
+                                # The original text is returned when every attempt failed; don't remember that
+                                if memory and served_key and translated_text != block.text:
+                                    memory.put(block.text, translated_text, *served_key)
+
+                                if deduplicate:
+                                    key = _dedup_key(block.text)
+                                    if dedup_leaders.get(key) == i:
+                                        del dedup_leaders[key]
+                                    followers = dedup_followers.pop(i, [])
+                                    if translated_text == block.text:
+                                        # Failed: the copies are translated on their own rather than left untranslated
+                                        redispatch.extend(followers)
+                                        duplicates -= len(followers)
+                                        continue
+                                    dedup_translations[key] = translated_text
+                                    if len(dedup_translations) > _DEDUP_MAX_ENTRIES:
+                                        dedup_translations.popitem(last=False)
+                                    for j in followers:
+                                        follower = blocks.get(j)
+                                        follower.translated = translated_text
+                                        to_checkpoint.append((j, follower.text, translated_text))
+
+            # Every block is in the output file now, the journal is no longer needed
+            journal.remove()
             logging.info(f"Translation complete! Saved to {output_path}")
             return True
 
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, asyncio.CancelledError):
             logging.info("\nTranslation interrupted by user.")
             raise
         except Exception as e:
             logging.error(f"An unexpected error occurred during processing: {e}")
             return False
+        finally:
+            # Don't wait for blocks still in flight after an interruption; they are re-translated on resume
+            for task in in_flight:
+                task.cancel()
+            journal.close()
+            if restored_from_journal:
+                logging.info(f"Restored {restored_from_journal} translated blocks from the checkpoint journal.")
+            if memory:
+                lookups = memory_hits + memory_misses
+                hit_rate = (100.0 * memory_hits / lookups) if lookups else 0.0
+                logging.info(f"Translation memory: {memory_hits} hits, {memory_misses} misses ({hit_rate:.1f}% hit rate).")
+                memory.close()
+            stats.blocks_from_memory = memory_hits
+            stats.blocks_deduplicated = duplicates
+            if duplicates:
+                logging.info(f"Deduplication: {duplicates} repeated blocks reused an earlier translation instead of calling the LLM.")
+            stats.blocks_from_journal = restored_from_journal
+            _report_stats(stats, srt_path)
     finally:
+        _CURRENT_STATS.reset(stats_token)
+        _CURRENT_FILE.reset(context_token)
         logging.getLogger().removeHandler(file_handler)
         file_handler.close()
 
 
-def watch_directory(folder: str, target_lang: str, output_suffix: str):
+def translate_file(srt_path: str, target_lang: str, output_suffix: str) -> bool:
+    """Synchronous entry point: run :func:`translate_file_async` on a new event loop."""
+    return asyncio.run(translate_file_async(srt_path, target_lang, output_suffix))
+
+
+async def translate_file_multi_async(srt_path: str, targets: list) -> bool:
+    """Translate *srt_path* into several languages at once. Returns True if every output succeeded.
+
+    *targets* is a list of ``(target_lang, output_suffix)`` pairs. Each
+    language runs its own pipeline, all of them concurrently on the running
+    loop: they share the source file analysis, the request semaphore, rate
+    limiter and translation memory, and the languages' logs and metrics are
+    tagged with their output suffix.
+    """
+    if len(targets) == 1:
+        return await translate_file_async(srt_path, *targets[0])
+
+    logging.info(f"Translating {srt_path} into {', '.join(lang for lang, _ in targets)}...")
+    results = await asyncio.gather(*(
+        translate_file_async(srt_path, target_lang, output_suffix, log_tag=f".{output_suffix.lstrip('.')}")
+        for target_lang, output_suffix in targets
+    ))
+    return all(results)
+
+
+def translate_file_multi(srt_path: str, targets: list) -> bool:
+    """Synchronous entry point: run :func:`translate_file_multi_async` on a new event loop."""
+    return asyncio.run(translate_file_multi_async(srt_path, targets))
+
+
+def _parse_targets(target_lang: str, output_suffix: str, extra_targets) -> list:
+    """Build the ``(target_lang, output_suffix)`` list from the main target and the extra ones.
+
+    Extra targets are ``{"target_language": ..., "output_suffix": ...}`` dicts
+    (from the config) or ``"lang[:suffix]"`` strings (from the command line);
+    the suffix defaults to ``.<lang>``.
+    """
+    targets = [(target_lang, output_suffix)]
+    for extra in extra_targets or []:
+        if isinstance(extra, dict):
+            lang, suffix = extra.get("target_language"), extra.get("output_suffix")
+        else:
+            lang, _, suffix = extra.partition(":")
+        if not lang:
+            logging.warning(f"Ignoring extra target without a language: {extra}")
+            continue
+        suffix = suffix or f".{lang}"
+        if any(suffix.lstrip('.').lower() == s.lstrip('.').lower() for _, s in targets):
+            logging.warning(f"Ignoring extra target {lang}: output suffix '{suffix}' is already used.")
+            continue
+        targets.append((lang, suffix))
+    return targets
+
+
+def _find_pending_files(folder: str, output_suffixes: list, processed_files: dict, priority: str,
+                        debounce: float = 0.0, filenames=None):
+    """Find new or modified subtitles in *folder*, skipping outputs labeled with any of *output_suffixes*.
+
+    Only *filenames* are checked when given, otherwise the whole folder is listed.
+    Returns ``(pending, settling)``: *pending* holds ``(srt_path, filename, mtime)``
+    in priority order, *settling* the names of files modified less than *debounce*
+    seconds ago, which may still be being copied and are left for later.
+
+    *priority* is either ``"oldest"`` (oldest modification time first) or ``"smallest"`` (smallest file first).
+    """
+    pending = []
+    settling = []
+    now = time.time()
+    for filename in (os.listdir(folder) if filenames is None else filenames):
+        srt_path = os.path.join(folder, filename)
+        if not os.path.isfile(srt_path):
+            continue
+
+        # Filter logic: skip logs, non-srt files, and files that already contain the output suffix.
+        is_srt = filename.lower().endswith(".srt")
+        is_log = filename.lower().startswith("log_")
+        # A file is considered already processed if it contains ".suffix." or ends with ".suffix.srt"
+        already_labeled = any(
+            f".{clean_suffix}." in filename.lower() or filename.lower().endswith(f".{clean_suffix}.srt")
+            for clean_suffix in (suffix.lower().lstrip('.') for suffix in output_suffixes)
+        )
+
+        if is_srt and not is_log and not already_labeled:
+            try:
+                mtime = os.path.getmtime(srt_path)
+                size = os.path.getsize(srt_path)
+            except OSError:
+                continue  # File might have been removed
+
+            if processed_files.get(srt_path) == mtime:
+                continue  # Already fully translated this version
+
+            if now - mtime < debounce:
+                settling.append(filename)
+                continue
+
+            sort_key = (size, mtime) if priority == "smallest" else (mtime, size)
+            pending.append((sort_key, srt_path, filename, mtime))
+
+    pending.sort()
+    return [(srt_path, filename, mtime) for _, srt_path, filename, mtime in pending], settling
+
+
+def _open_folder_watcher(folder: str):
+    """Return an inotify watcher for *folder* according to ``watch_backend``, or None to poll the folder."""
+    backend = get_config().get("watch_backend", "auto")
+    if backend == "poll" or (backend == "auto" and not inotify_watch.is_supported()):
+        return None
+    if backend == "auto" and inotify_watch.is_network_filesystem(folder):
+        logging.info(f"'{folder}' is on a network mount, where inotify misses changes made by other machines. Polling it.")
+        return None
+
+    try:
+        return inotify_watch.InotifyWatcher(folder)
+    except OSError as e:
+        logging.warning(f"File system events are not available for '{folder}' ({e}). Falling back to polling.")
+        return None
+
+
+async def watch_directory_async(folder: str, target_lang: str, output_suffix: str, extra_targets=()):
+    """Watch *folder* and translate new or modified .srt files, several at a time.
+
+    Each file is also translated into the *extra_targets* ``(target_lang,
+    output_suffix)`` pairs, see :func:`translate_file_multi_async`.
+
+    On Linux the folder is watched with inotify, reacting to files being
+    closed after writing or moved in, and listed in full every
+    ``watch_rescan_seconds`` to catch missed events and retry failed files;
+    elsewhere (on network mounts, or with ``watch_backend`` set to ``"poll"``)
+    it is listed every 5 seconds. Files modified less than
+    ``watch_debounce_seconds`` ago are left alone until they settle.
+
+    Up to ``watch_parallel_files`` files are translated concurrently, picked in
+    ``watch_priority`` order. They all share the loop's request semaphore, so
+    ``max_concurrent_requests`` caps the LLM requests across every file.
+    """
     if not os.path.exists(folder) or not os.path.isdir(folder):
         logging.error(f"Watch directory does not exist or is not a folder: {folder}")
         return
@@ -392,51 +1396,119 @@ def watch_directory(folder: str, target_lang: str, output_suffix: str):
     processed_folder = os.path.join(folder, "processed")
     os.makedirs(processed_folder, exist_ok=True)
 
-    logging.info(f"Watching folder '{folder}' for new .srt files (skipping files with '{output_suffix}')...")
+    max_parallel_files = max(1, int(get_config().get("watch_parallel_files", 1)))
+    priority = get_config().get("watch_priority", "oldest")
+    debounce = float(get_config().get("watch_debounce_seconds", 2))
+    rescan_interval = max(1.0, float(get_config().get("watch_rescan_seconds", 60)))
+
+    try:
+        _get_loop_resources()
+    except Exception as e:
+        logging.error(f"Failed to initialize LLM client: {e}")
+        return
+
+    watcher = _open_folder_watcher(folder)
+    # With inotify, only the files named by events are checked, plus the whole folder at startup and
+    # every rescan_interval seconds
+    changed = asyncio.Event()
+    candidates = set()
+    rescan = True
+    next_rescan = time.monotonic()
+
+    def on_folder_events():
+        nonlocal rescan
+        filenames, overflowed = watcher.read_events()
+        candidates.update(filenames)
+        rescan = rescan or overflowed
+        changed.set()
+
+    if watcher is not None:
+        asyncio.get_running_loop().add_reader(watcher.fileno(), on_folder_events)
+
+    targets = [(target_lang, output_suffix)] + list(extra_targets)
+    output_suffixes = [suffix for _, suffix in targets]
+    logging.info(f"Watching folder '{folder}' for new .srt files (skipping files with '{', '.join(output_suffixes)}')...")
+    detection = f"inotify events (full rescan every {rescan_interval:g} seconds)" if watcher is not None else "polling every 5 seconds"
+    logging.info(f"Using {detection} to detect new files.")
+    logging.info(f"Translating up to {max_parallel_files} files at a time, {priority} first.")
     logging.info(f"Successfully processed files will be moved to '{processed_folder}'.")
     logging.info("Press Ctrl+C to stop.")
 
     processed_files = {}  # Map path -> mtime
+    running = {}  # Map task -> (path, filename, mtime)
     try:
         while True:
-            for filename in os.listdir(folder):
-                srt_path = os.path.join(folder, filename)
-                if not os.path.isfile(srt_path):
+            changed.clear()
+            if watcher is not None and time.monotonic() >= next_rescan:
+                rescan = True
+            if rescan:
+                next_rescan = time.monotonic() + rescan_interval
+            filenames = None if (watcher is None or rescan) else list(candidates)
+            rescan = False
+            pending, settling = _find_pending_files(folder, output_suffixes, processed_files, priority, debounce, filenames)
+
+            running_paths = {srt_path for srt_path, _, _ in running.values()}
+            waiting = set(settling)
+            for srt_path, filename, mtime in pending:
+                if srt_path in running_paths:
+                    continue
+                if len(running) >= max_parallel_files:
+                    waiting.add(filename)
                     continue
 
-                # Filter logic: skip logs, non-srt files, and files that already contain the output suffix.
-                is_srt = filename.lower().endswith(".srt")
-                is_log = filename.lower().startswith("log_")
-                clean_suffix = output_suffix.lower().lstrip('.')
-                # A file is considered already processed if it contains ".suffix." or ends with ".suffix.srt"
-                already_labeled = f".{clean_suffix}." in filename.lower() or filename.lower().endswith(f".{clean_suffix}.srt")
+                # Found a file that is new or modified
+                logging.info(f"\n--- Processing new or modified file: {filename} ---")
+                task = asyncio.create_task(translate_file_multi_async(srt_path, targets))
+                running[task] = (srt_path, filename, mtime)
+            candidates.clear()
+            candidates.update(waiting)
 
-                if is_srt and not is_log and not already_labeled:
-                    try:
-                        mtime = os.path.getmtime(srt_path)
-                    except OSError:
-                        continue  # File might have been removed
+            # Wake up when a file finishes, when the folder changes, or to re-check settling files
+            if watcher is None:
+                timeout = 5
+            else:
+                timeout = max(0.0, next_rescan - time.monotonic())
+                if settling:
+                    timeout = min(timeout, debounce)
+            waiters = set(running)
+            change_waiter = asyncio.create_task(changed.wait()) if watcher is not None else None
+            if change_waiter is not None:
+                waiters.add(change_waiter)
+
+            if waiters:
+                done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            else:
+                await asyncio.sleep(timeout)
+                done = set()
+            if change_waiter is not None:
+                change_waiter.cancel()
 
-                    if processed_files.get(srt_path) == mtime:
-                        continue  # Already fully translated this version
+            for task in done:
+                if task not in running:
+                    continue
+                srt_path, filename, mtime = running.pop(task)
+                try:
+                    if task.result():
+                        processed_files[srt_path] = mtime
+                        dest_path = os.path.join(processed_folder, filename)
+                        if os.path.exists(dest_path):
+                            os.remove(dest_path)
+                        shutil.move(srt_path, dest_path)
+                        logging.info(f"Moved '{filename}' to processed folder.")
+                except Exception as e:
+                    logging.error(f"Failed to process {srt_path}: {e}")
+    finally:
+        for task in running:
+            task.cancel()
+        if watcher is not None:
+            asyncio.get_running_loop().remove_reader(watcher.fileno())
+            watcher.close()
 
-                    # Found a file that is new or modified
-                    logging.info(f"\n--- Processing new or modified file: {filename} ---")
-                    try:
-                        success = translate_file(srt_path, target_lang, output_suffix)
-                        if success:
-                            processed_files[srt_path] = mtime
-                            dest_path = os.path.join(processed_folder, filename)
-                            if os.path.exists(dest_path):
-                                os.remove(dest_path)
-                            shutil.move(srt_path, dest_path)
-                            logging.info(f"Moved '{filename}' to processed folder.")
-                    except KeyboardInterrupt:
-                        raise
-                    except Exception as e:
-                        logging.error(f"Failed to process {srt_path}: {e}")
-
-            time.sleep(5)
+
+def watch_directory(folder: str, target_lang: str, output_suffix: str, extra_targets=()):
+    """Synchronous entry point: run :func:`watch_directory_async` until interrupted."""
+    try:
+        asyncio.run(watch_directory_async(folder, target_lang, output_suffix, extra_targets))
     except KeyboardInterrupt:
         logging.info("\nStopped watching folder.")
 
@@ -445,27 +1517,42 @@ def main():
     parser = argparse.ArgumentParser(description="Translate SRT subtitles using an LLM (local or cloud).")
     parser.add_argument("srt_file", nargs='?', help="Path to the .srt file to translate. If omitted, watches folder defined in config.")
     parser.add_argument("--target-lang", help="Target language (overrides config).")
+    parser.add_argument("--extra-target", action="append", metavar="LANG[:SUFFIX]",
+                        help="Also translate into this language, in the same pass (repeatable, overrides config).")
     args = parser.parse_args()
 
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    # Importing openai is the slowest part of the start-up; do it while the config and the first file are read
+    threading.Thread(target=_warm_up, daemon=True).start()
+
+    try:
+        _client_settings()
+    except Exception as e:
+        logging.error(f"Failed to load configuration: {e}")
+        exit(1)
+
     # Determine target language and exit if not found
-    target_lang = args.target_lang or CONFIG.get("translation", {}).get("target_language")
+    target_lang = args.target_lang or get_config().get("translation", {}).get("target_language")
     if not target_lang:
         logging.error("Target language NOT defined. Please specify 'target_language' in 'config.json' or use '--target-lang'.")
         exit(1)
 
-    output_suffix = CONFIG.get("translation", {}).get("output_suffix", "_llm_translated")
+    output_suffix = get_config().get("translation", {}).get("output_suffix", "_llm_translated")
+    targets = _parse_targets(target_lang, output_suffix,
+                             args.extra_target or get_config().get("translation", {}).get("extra_targets", []))
 
     if args.srt_file:
         try:
-            translate_file(args.srt_file, target_lang, output_suffix)
+            translate_file_multi(args.srt_file, targets)
         except KeyboardInterrupt:
             logging.info("\nClosing and exiting...")
     else:
-        watch_folder = CONFIG.get("watch_folder")
+        watch_folder = get_config().get("watch_folder")
         if not watch_folder:
             logging.error("No input file provided and 'watch_folder' is not set in config.json.")
             exit(1)
-        watch_directory(watch_folder, target_lang, output_suffix)
+        watch_directory(watch_folder, target_lang, output_suffix, targets[1:])
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,188 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+
+def normalize_source(text: str) -> str:
+    """Normalize source text for lookups: collapse whitespace inside each line and drop empty lines."""
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class TranslationMemory:
+    """On-disk translation memory backed by SQLite.
+
+    Entries are keyed by the normalized source text plus any extra key parts
+    (target language, model, prompt version...). The number of entries is
+    capped at *max_entries*; the least recently used ones are evicted first.
+    Entries older than *max_age* seconds are ignored and deleted (None keeps
+    them forever), and up to *memory_entries* recently used ones are also
+    kept in memory in front of the database. Safe to share between threads.
+    """
+
+    # Run the eviction check only every N inserts, counting rows is not free on large tables
+    _EVICT_EVERY = 100
+    # Hits served from memory update last_used in the database in batches of this many
+    _TOUCH_EVERY = 100
+
+    def __init__(self, path: str, max_entries: int = 100000, max_age=None, memory_entries: int = 0):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.memory_entries = memory_entries
+        self._inserts_since_evict = 0
+        self._recent = OrderedDict()  # key -> (translated, created)
+        self._touched = {}  # key -> last_used of memory hits not written to the database yet
+        self._lock = threading.RLock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " key TEXT PRIMARY KEY,"
+            " source TEXT NOT NULL,"
+            " translated TEXT NOT NULL,"
+            " scope TEXT NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " created REAL NOT NULL DEFAULT 0)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(translations)")]
+        if "created" not in columns:
+            # Databases from before expiry existed: their entries count as created now
+            self._conn.execute("ALTER TABLE translations ADD COLUMN created REAL NOT NULL DEFAULT 0")
+            self._conn.execute("UPDATE translations SET created = ?", (time.time(),))
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def _make_key(source: str, key_parts: tuple) -> str:
+        raw = "\x1f".join((normalize_source(source),) + tuple(str(p) for p in key_parts))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _is_expired(self, created: float) -> bool:
+        return self.max_age is not None and time.time() - created > self.max_age
+
+    def _remember(self, key: str, translated: str, created: float):
+        if self.memory_entries <= 0:
+            return
+        self._recent[key] = (translated, created)
+        self._recent.move_to_end(key)
+        if len(self._recent) > self.memory_entries:
+            self._recent.popitem(last=False)
+
+    def _write_touched(self):
+        """Write the last_used time of the hits served from memory (the caller commits)."""
+        if self._touched:
+            self._conn.executemany("UPDATE translations SET last_used = ? WHERE key = ?",
+                                   [(last_used, key) for key, last_used in self._touched.items()])
+            self._touched.clear()
+
+    def get(self, source: str, *key_parts):
+        """Return the stored translation of *source*, or None on a miss."""
+        key = self._make_key(source, key_parts)
+        with self._lock:
+            recent = self._recent.get(key)
+            if recent is not None and not self._is_expired(recent[1]):
+                self._recent.move_to_end(key)
+                self._touched[key] = time.time()
+                if len(self._touched) >= self._TOUCH_EVERY:
+                    self._write_touched()
+                    self._conn.commit()
+                self.memory_hits += 1
+                return recent[0]
+
+            row = self._conn.execute("SELECT translated, created FROM translations WHERE key = ?", (key,)).fetchone()
+            if row is not None and self._is_expired(row[1]):
+                self._conn.execute("DELETE FROM translations WHERE key = ?", (key,))
+                self._conn.commit()
+                self._recent.pop(key, None)
+                self.expired += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE translations SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self._remember(key, row[0], row[1])
+            self.disk_hits += 1
+            return row[0]
+
+    def put(self, source: str, translated: str, *key_parts):
+        """Store the translation of *source*, evicting the least recently used entries if over the cap."""
+        key = self._make_key(source, key_parts)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations (key, source, translated, scope, last_used, created)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, normalize_source(source), translated, "|".join(str(p) for p in key_parts), now, now)
+            )
+            self._touched.pop(key, None)
+            self._write_touched()
+            self._conn.commit()
+            self._remember(key, translated, now)
+
+            self._inserts_since_evict += 1
+            if self._inserts_since_evict >= self._EVICT_EVERY:
+                self.evict()
+
+    def stats(self) -> dict:
+        """Lookup counters since the memory was opened."""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": round(hits / lookups, 4) if lookups else None,
+            }
+
+    def evict(self):
+        """Delete the expired entries, then the least recently used ones above *max_entries*."""
+        with self._lock:
+            self._inserts_since_evict = 0
+            # Memory hits count as uses too, so the entries they kept alive are not evicted
+            if self._touched:
+                self._write_touched()
+                self._conn.commit()
+            if self.max_age is not None:
+                deleted = self._conn.execute(
+                    "DELETE FROM translations WHERE created < ?", (time.time() - self.max_age,)
+                ).rowcount
+                if deleted > 0:
+                    self._conn.commit()
+                    logging.info(f"Translation memory: deleted {deleted} expired entries.")
+
+            count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            excess = count - self.max_entries
+            if excess <= 0:
+                return
+
+            self._conn.execute(
+                "DELETE FROM translations WHERE key IN (SELECT key FROM translations ORDER BY last_used ASC LIMIT ?)",
+                (excess,)
+            )
+            self._conn.commit()
+            self._recent.clear()
+            logging.info(f"Translation memory: evicted {excess} least recently used entries.")
+
+    def close(self):
+        with self._lock:
+            self.evict()
+            self._conn.close()